@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from lib.utils import BinaryReader
+from lib.sc.texture import PIXEL_READ_FUNCTIONS, PIXEL_SIZES, decode_pixels
+
+
+class _ReaderHolder:
+    def __init__(self, data: bytes) -> None:
+        self.reader = BinaryReader(data)
+
+
+def legacy_decode(data: bytes, pixel_internal_format: str, count: int):
+    swf = _ReaderHolder(data)
+    read_pixel = PIXEL_READ_FUNCTIONS[pixel_internal_format]
+
+    return [read_pixel(swf) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares per-pixel and vectorized SWFTexture decoding")
+    parser.add_argument("-s", "--size", help="Texture width and height", type=int, default=512)
+    args = parser.parse_args()
+
+    count = args.size * args.size
+    print(f"Decoding {args.size}x{args.size} textures")
+
+    for pixel_internal_format, pixel_size in PIXEL_SIZES.items():
+        data = os.urandom(count * pixel_size)
+
+        start_time = time.perf_counter()
+        legacy = legacy_decode(data, pixel_internal_format, count)
+        legacy_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        pixels = decode_pixels(data, pixel_internal_format, count)
+        vectorized_time = time.perf_counter() - start_time
+
+        matches = np.array_equal(np.array(legacy, np.uint8).reshape(pixels.shape), pixels)
+
+        print(f"{pixel_internal_format:<22} legacy: {legacy_time:8.3f}s  vectorized: {vectorized_time:8.4f}s  "
+              f"speedup: {legacy_time / max(vectorized_time, 1e-9):8.0f}x  matches: {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import sys
+import json
+import time
 
 import colorama
 
@@ -28,21 +30,121 @@ def Time(seconds):
     return ' '.join(temp[::-1])
 
 class Console:
+    # output levels, messages below Console.level are dropped
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+    QUIET = 100
+
+    LEVELS = {
+        "debug": DEBUG,
+        "info": INFO,
+        "warning": WARNING,
+        "error": ERROR,
+        "quiet": QUIET
+    }
+
+    level: int = INFO
+    json: bool = False
+
+    # progress bars are redrawn at most this often (in seconds), except their last update
+    progress_interval: float = 0.1
+
+    _progress_message: str = None
+    _progress_time: float = 0.0
+    _progress_line: bool = False
+
+    @staticmethod
+    def configure(level: int = None, json_output: bool = None, progress_interval: float = None):
+        if level is not None:
+            Console.level = Console.LEVELS[level] if isinstance(level, str) else level
+
+        if json_output is not None:
+            Console.json = json_output
+
+        if progress_interval is not None:
+            Console.progress_interval = progress_interval
+
+    @staticmethod
+    def log(level: int, name: str, color: str, message: str):
+        if level < Console.level:
+            return
+
+        Console.end_progress()
+
+        if Console.json:
+            sys.stdout.write(json.dumps({"level": name, "message": message}) + "\n")
+        else:
+            sys.stdout.write(color + f"[{name.upper()}] {message}" + colorama.Style.RESET_ALL + "\n")
+
     @staticmethod
     def title(message):
+        if Console.INFO < Console.level or Console.json:
+            return
+
         print(colorama.Fore.GREEN + message.center(get_terminal_size().columns) + colorama.Style.RESET_ALL)
+
+    @staticmethod
+    def debug(message: str):
+        Console.log(Console.DEBUG, "debug", colorama.Fore.CYAN, message)
+
     @staticmethod
     def info(message: str):
-        print(colorama.Fore.GREEN + f"[INFO] {message}" + colorama.Style.RESET_ALL)
+        Console.log(Console.INFO, "info", colorama.Fore.GREEN, message)
 
     @staticmethod
     def warning(message: str):
-        print(colorama.Fore.MAGENTA + f"[WARNING] {message}" + colorama.Style.RESET_ALL)
+        Console.log(Console.WARNING, "warning", colorama.Fore.MAGENTA, message)
 
     @staticmethod
     def error(message: str):
-        print(colorama.Fore.RED + f"[ERROR] {message}" + colorama.Style.RESET_ALL)
+        Console.log(Console.ERROR, "error", colorama.Fore.RED, message)
+
+    @staticmethod
+    def newline():
+        """Blank line between output sections, skipped when it would not be shown."""
+        if Console.INFO < Console.level or Console.json:
+            return
+
+        Console.end_progress()
+        sys.stdout.write("\n")
 
     @staticmethod
     def progress_bar(message, current, total, start=0, end=100):
-        sys.stdout.write(colorama.Fore.GREEN + f"\r[{((current + 1) * end + start) // total + start}%] {message}" + colorama.Style.RESET_ALL)
+        # returns before any formatting when progress is not shown, so hot loops pay only for the call
+        if Console.INFO < Console.level:
+            return
+
+        now = time.perf_counter()
+        finished = current + 1 >= total
+
+        if not finished and message == Console._progress_message and now - Console._progress_time < Console.progress_interval:
+            return
+
+        percent = ((current + 1) * end + start) // total + start
+
+        if Console.json:
+            sys.stdout.write(json.dumps({"level": "progress", "message": message, "percent": percent}) + "\n")
+        elif sys.stdout.isatty():
+            sys.stdout.write(colorama.Fore.GREEN + f"\r[{percent}%] {message}" + colorama.Style.RESET_ALL)
+            Console._progress_line = True
+        elif finished:
+            # logs of batch jobs get only the final state of each progress bar
+            sys.stdout.write(colorama.Fore.GREEN + f"[{percent}%] {message}" + colorama.Style.RESET_ALL)
+            Console._progress_line = True
+
+        Console._progress_message = message
+        Console._progress_time = now
+
+        if finished:
+            Console.end_progress()
+
+    @staticmethod
+    def end_progress():
+        """Moves to a new line if a progress bar is drawn on the current one."""
+        if Console._progress_line:
+            sys.stdout.write("\n")
+
+        Console._progress_line = False
+        Console._progress_message = None
@@ -18,6 +18,7 @@ from lib.fla.dom.symbol_instance import DOMSymbolInstance
 from lib.fla.dom.shape import DOMShape
 from lib.fla.dom.static_text import DOMStaticText
 from lib.fla.dom.dynamic_text import DOMDynamicText
+from lib.fla.dom.frame_instance import FrameInstance
 from lib.fla.dom.text_run import DOMTextRun
 from lib.fla.dom.text_attrs import DOMTextAttrs
 
@@ -200,7 +200,6 @@ class DOMDocument:
                 Bitmap.save(os.path.join(self.binarypath, medium.bitmap_data_href), medium.image)
 
             Console.progress_bar("Adobe binary images saving...", i, len(self.media))
-        print()
         
         for symbol_name, symbol in self.symbols.items():
             include = Element("Include")
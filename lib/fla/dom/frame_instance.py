@@ -0,0 +1,24 @@
+from ..geom.matrix import Matrix
+from ..geom.color import Color
+
+
+class FrameInstance:
+    """Frame element that has its own matrix and color and shares every other field with a template instance.
+    It is saved as an element of template type, so template is never copied."""
+
+    def __init__(self, template) -> None:
+        self.template = template
+
+        # elements, groups have no color
+        self.matrix: Matrix = template.matrix
+        self.color: Color = getattr(template, "color", None)
+
+    def __getattr__(self, name: str):
+        # only called for fields that are not set on frame instance itself
+        if name == "template":
+            raise AttributeError(name)
+
+        return getattr(self.template, name)
+
+    def save(self):
+        return type(self.template).save(self)
@@ -0,0 +1,100 @@
+import os
+import mmap
+import hashlib
+import tempfile
+
+from .compression import decompress_file
+
+
+class DecompressionCache:
+    """Content-addressed directory of decompressed .sc payloads with least-recently-used eviction."""
+
+    EXTENSION = ".bin"
+
+    def __init__(self, directory: str, max_size: int = 4 * 1024 ** 3) -> None:
+        self.directory = directory
+        self.max_size = max_size
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(filepath: str):
+        with open(filepath, 'rb') as file:
+            if not file.seek(0, 2):
+                return hashlib.sha256().hexdigest()
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return hashlib.sha256(mapped).hexdigest()
+
+    def get_path(self, key: str):
+        return os.path.join(self.directory, key + self.EXTENSION)
+
+    def decompress_file(self, filepath: str):
+        key = self.get_key(filepath)
+
+        data = self.load(key)
+        if data is None:
+            data = decompress_file(filepath)
+            self.store(key, data)
+
+        return data
+
+    def load(self, key: str):
+        """Returns read-only memory-mapped payload for key or None on cache miss."""
+        path = self.get_path(key)
+
+        try:
+            with open(path, 'rb') as file:
+                os.utime(path)  # marks entry as recently used
+
+                if not file.seek(0, 2):
+                    return bytearray()
+
+                return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        except FileNotFoundError:
+            return None
+
+    def store(self, key: str, data):
+        descriptor, temp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+
+            os.replace(temp_path, self.get_path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.evict(keep=key)
+
+    def evict(self, keep: str = None):
+        entries = []
+        total_size = 0
+
+        with os.scandir(self.directory) as scanned:
+            for entry in scanned:
+                if not entry.name.endswith(self.EXTENSION):
+                    continue
+
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, entry.name))
+                total_size += stat.st_size
+
+        for _, size, name in sorted(entries):
+            if total_size <= self.max_size:
+                break
+
+            if keep and name == keep + self.EXTENSION:
+                continue
+
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:  # already evicted or still mapped by another process
+                continue
+
+            total_size -= size
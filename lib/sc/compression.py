@@ -0,0 +1,216 @@
+import lzma
+import mmap
+import time
+
+from hashlib import md5
+from struct import Struct
+
+from sc_compression import Compressor, Decompressor
+from sc_compression.signatures import Signatures
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+MAGIC_SC = b"SC"
+MAGIC_SCLZ = b"SCLZ"
+MAGIC_SIG = b"Sig:"
+MAGIC_ZSTD = b"\x28\xb5\x2f\xfd"
+
+BIG_INT = Struct(">i")
+INT = Struct("<i")
+
+CHUNK_SIZE = 1024 * 1024
+
+# compression backends by name: SC header version and sc_compression signature
+COMPRESSION_SIGNATURES = {
+    "lzma": (1, Signatures.SC),
+    "lzham": (1, Signatures.SCLZ),
+    "zstd": (3, Signatures.SC)
+}
+
+
+def decompress_file(filepath: str):
+    """Memory-maps a Supercell compressed file and decompresses it into a single buffer."""
+    with open(filepath, 'rb') as file:
+        if not file.seek(0, 2):
+            return bytearray()
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return decompress(view)
+
+
+def decompress(data):
+    """Decompresses a Supercell compressed buffer, streaming the payload into one preallocated buffer."""
+    view = memoryview(data)
+    offset = payload_offset(view)
+    payload = view[offset:]
+
+    if payload[:4] == MAGIC_SCLZ:
+        return bytearray(Decompressor().decompress(bytes(view)))
+
+    if payload[:4] == MAGIC_ZSTD:
+        return decompress_zstd(payload)
+
+    if offset or (len(payload) > 9 and payload[1:3] == b"\x00\x00"):
+        return decompress_lzma(payload)
+
+    return bytearray(view)
+
+
+def payload_offset(view) -> int:
+    """Parses the SC or Sig header and returns the offset of the compressed payload."""
+    if view[:4] == MAGIC_SIG:
+        return 68
+
+    if view[:2] != MAGIC_SC or view[:4] == MAGIC_SCLZ:
+        return 0
+
+    offset = 2
+    version, = BIG_INT.unpack_from(view, offset)
+    offset += 4
+
+    if version == 4:
+        version, = BIG_INT.unpack_from(view, offset)
+        offset += 4
+
+    # versions 5 and 6 are written in little endian and store metadata in the header
+    if version in (0x05000000, 0x06000000):
+        if version == 0x06000000:
+            offset += 2
+
+        metadata_length, = INT.unpack_from(view, offset)
+        return offset + 4 + metadata_length
+
+    hash_length, = BIG_INT.unpack_from(view, offset)
+    return offset + 4 + hash_length
+
+
+def decompress_lzma(payload):
+    uncompressed_size, = INT.unpack_from(payload, 5)
+
+    # the stream is decoded as one of unknown size and stopped once all declared bytes are out,
+    # so anything appended after it (like the "START" metadata trailer) is never touched
+    decompressor = lzma.LZMADecompressor(lzma.FORMAT_ALONE)
+    header = bytes(payload[:5]) + b"\xff" * 8
+
+    if uncompressed_size < 0:
+        return bytearray(decompressor.decompress(header + bytes(payload[9:])))
+
+    buffer = bytearray(uncompressed_size)
+    position = 0
+
+    data = header
+    offset = 9
+    while position < uncompressed_size:
+        if data is None:
+            if not decompressor.needs_input:
+                data = b""
+            elif offset < len(payload):
+                data = payload[offset:offset + CHUNK_SIZE]
+                offset += CHUNK_SIZE
+            else:
+                raise lzma.LZMAError("Compressed data ended before the end of the stream")
+
+        chunk = decompressor.decompress(data, min(uncompressed_size - position, CHUNK_SIZE))
+        buffer[position:position + len(chunk)] = chunk
+        position += len(chunk)
+
+        data = None
+
+    return buffer
+
+
+def decompress_zstd(payload):
+    if zstandard is None:
+        raise TypeError("zstandard module is required to decompress ZSTD files")
+
+    uncompressed_size = zstandard.frame_content_size(payload)
+
+    with zstandard.ZstdDecompressor().stream_reader(payload) as reader:
+        if uncompressed_size < 0:
+            return bytearray(reader.readall())
+
+        buffer = bytearray(uncompressed_size)
+        with memoryview(buffer) as view:
+            position = 0
+            while position < uncompressed_size:
+                read = reader.readinto(view[position:])
+                if not read:
+                    raise zstandard.ZstdError("Compressed data ended before the end of the frame")
+
+                position += read
+
+    return buffer
+
+
+def compress(data, signature: str = "lzma", level: int = None, threads: int = -1) -> bytes:
+    """Compresses a buffer into a Supercell compressed file.
+    LZMA and ZSTD levels are preset levels, ZSTD threads are compression workers (-1 means one per CPU, 0 means none)."""
+    if signature not in COMPRESSION_SIGNATURES:
+        raise TypeError(f"Unknown compression signature {signature}")
+
+    version, _ = COMPRESSION_SIGNATURES[signature]
+
+    if signature == "lzma":
+        compressed = compress_lzma(data, level)
+
+    elif signature == "zstd":
+        compressed = compress_zstd(data, level, threads)
+
+    else:
+        # LZHAM has no Python fallback, so it is left to sc_compression when lzham module is installed
+        try:
+            import lzham
+        except ImportError:
+            raise TypeError("lzham module is required to compress SCLZ files")
+
+        return Compressor().compress(bytes(data), Signatures.SCLZ, version)
+
+    return write_header(data, version) + compressed
+
+
+def write_header(data, version: int) -> bytes:
+    data_hash = md5(data).digest()
+
+    return MAGIC_SC + BIG_INT.pack(version) + BIG_INT.pack(len(data_hash)) + data_hash
+
+
+def compress_lzma(data, level: int = None):
+    filters = Compressor.lzma_filters
+    if level is not None:
+        filters = [dict(filters[0], preset=level)]
+
+    compressed = lzma.compress(data, format=lzma.FORMAT_ALONE, filters=filters)
+
+    # header of LZMA alone stream has 64-bit size, but Supercell files store it as 32-bit one
+    return compressed[:5] + INT.pack(len(data)) + compressed[13:]
+
+
+def compress_zstd(data, level: int = None, threads: int = -1):
+    if zstandard is None:
+        raise TypeError("zstandard module is required to compress ZSTD files")
+
+    # with threads input is split into jobs that are compressed concurrently into one frame
+    compressor = zstandard.ZstdCompressor(level=3 if level is None else level, threads=threads, write_content_size=True)
+    return compressor.compress(data)
+
+
+def benchmark_compression(data, level: int = None, threads: int = -1):
+    """Compresses a buffer with every available backend and returns (signature, size, seconds) for each of them."""
+    results = []
+
+    for signature in COMPRESSION_SIGNATURES:
+        start_time = time.perf_counter()
+
+        try:
+            compressed = compress(data, signature, level, threads)
+        except TypeError:
+            continue
+
+        results.append((signature, len(compressed), time.perf_counter() - start_time))
+
+    return results
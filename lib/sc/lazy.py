@@ -0,0 +1,121 @@
+from collections.abc import MutableMapping, MutableSequence
+
+
+class TagRecord:
+    def __init__(self, resource_class, tag: int, offset: int, length: int, reader, args: tuple = ()) -> None:
+        self.resource_class = resource_class
+        self.tag = tag
+        self.offset = offset
+        self.length = length
+        self.reader = reader
+        self.args = args
+
+        self.id: int = None
+
+    def decode(self, swf):
+        reader = swf.reader
+        position = self.reader.tell()
+
+        swf.reader = self.reader
+        swf.reader.seek(self.offset)
+
+        try:
+            resource = self.resource_class()
+            resource.load(swf, self.tag, *self.args)
+        finally:
+            self.reader.seek(position)
+            swf.reader = reader
+
+        return resource
+
+    def get_tag(self):
+        """Returns original tag bytes, including tag header."""
+        return self.reader.get_view(self.offset - 5, self.offset + self.length)
+
+
+class LazyResources(MutableMapping):
+    """Resources dict that keeps TagRecords and decodes each of them on first access."""
+
+    def __init__(self, swf) -> None:
+        self.swf = swf
+        self._data = {}
+
+    def __getitem__(self, id):
+        resource = self._data[id]
+
+        if isinstance(resource, TagRecord):
+            record = resource
+
+            resource = record.decode(self.swf)
+            resource.mark_clean(record.get_tag())
+            self._data[id] = resource
+
+        return resource
+
+    def __setitem__(self, id, resource):
+        self._data[id] = resource
+
+    def __delitem__(self, id):
+        del self._data[id]
+
+    def __contains__(self, id):
+        return id in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def record(self, id):
+        """Returns the TagRecord of a resource that was not decoded yet, otherwise None."""
+        resource = self._data.get(id)
+        return resource if isinstance(resource, TagRecord) else None
+
+
+class LazyTextures(MutableSequence):
+    """Textures list that keeps TagRecords and decodes each of them on first access.
+    Textures of an external texture file are read from it on first access to any texture."""
+
+    def __init__(self, swf, textures: list) -> None:
+        self.swf = swf
+        self._data = textures
+
+        # main file whose external texture file is not read yet
+        self.external_texture_source: str = None
+
+    def load_external_textures(self):
+        if self.external_texture_source is not None:
+            filepath = self.swf.get_texture_file(self.external_texture_source)
+            self.external_texture_source = None
+
+            self.swf.join_textures(self.swf.load_texture_file(filepath))
+
+    def __getitem__(self, index):
+        self.load_external_textures()
+
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        texture = self._data[index]
+
+        if isinstance(texture, TagRecord):
+            texture = texture.decode(self.swf)
+            self._data[index] = texture
+
+        return texture
+
+    def __setitem__(self, index, texture):
+        self.load_external_textures()
+        self._data[index] = texture
+
+    def __delitem__(self, index):
+        self.load_external_textures()
+        del self._data[index]
+
+    def __len__(self):
+        return len(self._data)
+
+    def insert(self, index, texture):
+        self.load_external_textures()
+        self._data.insert(index, texture)
@@ -1,5 +1,51 @@
+from lib.console import Console
+
 from .writable import Writable
-import numpy
+
+import numpy as np
+
+
+MATRIX_TAG_RECORD = np.dtype([("tag", "u1"), ("length", "<i4"), ("values", "<i4", 6)])
+COLOR_TRANSFORM_TAG_RECORD = np.dtype([("tag", "u1"), ("length", "<i4"), ("values", "u1", 7)])
+
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def read_tag_records(swf, record, tags: tuple, length: int, count: int):
+    """Reads up to `count` consecutive tags with the same layout, starting at the header of the current tag."""
+    start = swf.reader.tell() - 5
+    count = min(max(count, 1), (len(swf.reader) - start) // record.itemsize)
+
+    swf.reader.seek(start)
+    records = swf.reader.read_array(record, count)
+
+    valid = np.isin(records["tag"], tags) & (records["length"] == length)
+    if not valid.all():
+        records = records[:valid.argmin()]
+
+    swf.reader.seek(start + records.size * record.itemsize)
+    return records
+
+
+def quantize_matrices(values):
+    """Converts (count, 6) matrix values to fixed point and returns (tags, fixed values).
+    Tag 36 (1/65535) is only used for matrices that are closer to their values with it than with tag 8 (1/1024)
+    and whose values still fit in int."""
+    values = np.asarray(values, dtype=np.float64).reshape(-1, 6)
+
+    low = np.round(values[:, :4] * 1024)
+    high = np.round(values[:, :4] * 65535)
+
+    low_error = np.abs(low / 1024 - values[:, :4]).max(axis=1, initial=0)
+    high_error = np.abs(high / 65535 - values[:, :4]).max(axis=1, initial=0)
+
+    precise = (high_error < low_error) & ((high >= INT_MIN) & (high <= INT_MAX)).all(axis=1)
+
+    fixed = np.empty(values.shape, dtype=np.int64)
+    fixed[:, :4] = np.where(precise[:, None], high, low)
+    fixed[:, 4:] = np.round(values[:, 4:] * 20)
+
+    return np.where(precise, 36, 8), fixed
 
 class Color:
     def __init__(self,
@@ -43,6 +89,16 @@ class Color:
         swf.writer.write_uchar(round(self.g_mul * 255))
         swf.writer.write_uchar(round(self.b_mul * 255))
 
+    def get_key(self):
+        """Returns color transform values exactly as they are written."""
+        return (round(self.r_add),
+                round(self.g_add),
+                round(self.b_add),
+                round(self.a_mul * 255),
+                round(self.r_mul * 255),
+                round(self.g_mul * 255),
+                round(self.b_mul * 255))
+
 class Matrix:
     def __init__(self,
                  a: int = 1,
@@ -70,16 +126,29 @@ class Matrix:
         self.ty = swf.reader.read_twip()  # position y
 
     def save(self, swf):
-        swf.writer.write_uchar(8)
+        tag, *values = self.get_key()
+
+        swf.writer.write_uchar(tag)
         swf.writer.write_int(24)
 
-        swf.writer.write_int(int(round(self.a * 1024)))
-        swf.writer.write_int(int(round(self.b * 1024)))
-        swf.writer.write_int(int(round(self.c * 1024)))
-        swf.writer.write_int(int(round(self.d * 1024)))
+        for value in values:
+            swf.writer.write_int(value)
+
+    def get_key(self):
+        """Returns matrix tag and fixed-point values exactly as they are written."""
+        # same rules as quantize_matrices, without NumPy overhead for a single matrix
+        values = (self.a, self.b, self.c, self.d)
+
+        low = [round(value * 1024) for value in values]
+        high = [round(value * 65535) for value in values]
 
-        swf.writer.write_twip(self.tx)
-        swf.writer.write_twip(self.ty)
+        low_error = max(abs(fixed / 1024 - value) for fixed, value in zip(low, values))
+        high_error = max(abs(fixed / 65535 - value) for fixed, value in zip(high, values))
+
+        if high_error < low_error and all(INT_MIN <= fixed <= INT_MAX for fixed in high):
+            return (36, *high, round(self.tx * 20), round(self.ty * 20))
+
+        return (8, *low, round(self.tx * 20), round(self.ty * 20))
 
     def __eq__(a, b):
         if type(a) == type(b):
@@ -99,6 +168,12 @@ class MatrixBank(Writable):
         self.matrices_count: int = 0
         self.color_transforms_count: int = 0
 
+        # interning tables from written values to the first index, filled lazily for appended entries
+        self._matrix_indices: dict = {}
+        self._color_transform_indices: dict = {}
+        self._matrices_indexed: int = 0
+        self._color_transforms_indexed: int = 0
+
     def available_for_matrix(self, count=0):
         if len(self.matrices) >= 65534 - count:
             return False
@@ -110,6 +185,7 @@ class MatrixBank(Writable):
         return True
 
     def get_matrix(self, matrix: Matrix):
+        """Returns index of matrix in bank, adding it if there is no such matrix yet. Returns None if bank is full."""
         if isinstance(matrix, list):
             matrix = Matrix(matrix[0],
                             matrix[1],
@@ -125,16 +201,58 @@ class MatrixBank(Writable):
                             matrix["tx"],
                             matrix["ty"])
 
-        if matrix not in self.matrices:
+        if self._matrices_indexed > len(self.matrices):
+            self._matrix_indices = {}
+            self._matrices_indexed = 0
+
+        for x in range(self._matrices_indexed, len(self.matrices)):
+            self._matrix_indices.setdefault(self.matrices[x].get_key(), x)
+        self._matrices_indexed = len(self.matrices)
+
+        key = matrix.get_key()
+        index = self._matrix_indices.get(key)
+
+        if index is None:
+            if not self.available_for_matrix():
+                return None
+
+            index = len(self.matrices)
             self.matrices.append(matrix)
 
-        return self.matrices.index(matrix)
+            self._matrix_indices[key] = index
+            self._matrices_indexed += 1
 
-    def get_color_transform(self, color_transform: list):
-        if color_transform not in self.color_transforms:
+        return index
+
+    def get_color_transform(self, color_transform: Color):
+        """Returns index of color transform in bank, adding it if there is no such one yet. Returns None if bank is full."""
+        if isinstance(color_transform, list):
+            color_transform = Color(*color_transform)
+        elif isinstance(color_transform, dict):
+            color_transform = Color(**color_transform)
+
+        if self._color_transforms_indexed > len(self.color_transforms):
+            self._color_transform_indices = {}
+            self._color_transforms_indexed = 0
+
+        for x in range(self._color_transforms_indexed, len(self.color_transforms)):
+            self._color_transform_indices.setdefault(self.color_transforms[x].get_key(), x)
+        self._color_transforms_indexed = len(self.color_transforms)
+
+        key = color_transform.get_key()
+        index = self._color_transform_indices.get(key)
+
+        if index is None:
+            if not self.available_for_colors():
+                return None
+
+            index = len(self.color_transforms)
             self.color_transforms.append(color_transform)
 
-        return self.color_transforms.index(color_transform)
+            self._color_transform_indices[key] = index
+            self._color_transforms_indexed += 1
+
+        return index
 
     def load(self, swf):
         self.matrices_count = swf.reader.read_ushort()
@@ -143,10 +261,81 @@ class MatrixBank(Writable):
         self.matrices = [_class() for _class in [Matrix] * self.matrices_count]
         self.color_transforms= [_class() for _class in [Color] * self.color_transforms_count]
 
-    def save(self):
-        super().save()
+    def load_matrices(self, swf, offset: int):
+        records = read_tag_records(swf, MATRIX_TAG_RECORD, (8, 36), 24, self.matrices_count - offset)
+
+        if records.size == 0:
+            # tag has unexpected length, so it is read alone as before
+            tag = swf.reader.read_uchar()
+            swf.reader.read_int()
+
+            self.matrices[offset].load(swf, tag)
+            return 1
+
+        dividers = np.where(records["tag"] == 8, 1024, 65535)[:, None]
+        values = np.hstack((records["values"][:, :4] / dividers, records["values"][:, 4:] / 20))
+
+        for x, (a, b, c, d, tx, ty) in enumerate(values.tolist()):
+            self.matrices[offset + x] = Matrix(a, b, c, d, tx, ty)
+
+        return len(records)
+
+    def load_color_transforms(self, swf, offset: int):
+        records = read_tag_records(swf, COLOR_TRANSFORM_TAG_RECORD, (9,), 7, self.color_transforms_count - offset)
+
+        if records.size == 0:
+            # tag has unexpected length, so it is read alone as before
+            tag = swf.reader.read_uchar()
+            swf.reader.read_int()
+
+            self.color_transforms[offset].load(swf, tag)
+            return 1
+
+        values = records["values"].tolist()
+        for x, (r_add, g_add, b_add, a_mul, r_mul, g_mul, b_mul) in enumerate(values):
+            self.color_transforms[offset + x] = Color(r_add, g_add, b_add,
+                                                      a_mul / 255, r_mul / 255, g_mul / 255, b_mul / 255)
+
+        return len(records)
+
+    def save(self, swf):
+        tag_start = swf.writer.begin_tag()
+
+        swf.writer.write_ushort(len(self.matrices))
+        swf.writer.write_ushort(len(self.color_transforms))
+
+        swf.writer.end_tag(tag_start, 42)
+
+    def save_matrices(self, swf):
+        """Writes all matrix tags of the bank as one packed buffer."""
+        tags, fixed = quantize_matrices([(matrix.a, matrix.b, matrix.c, matrix.d, matrix.tx, matrix.ty)
+                                         for matrix in self.matrices])
+
+        if not ((fixed >= INT_MIN) & (fixed <= INT_MAX)).all():
+            Console.error(f"MatrixBank {self.index} has matrix values that do not fit in int! Aborting...")
+            raise TypeError()
+
+        records = np.empty(len(self.matrices), MATRIX_TAG_RECORD)
+        records["tag"] = tags
+        records["length"] = 24
+        records["values"] = fixed
+
+        swf.writer.write(records.tobytes())
+
+    def save_color_transforms(self, swf):
+        """Writes all color transform tags of the bank as one packed buffer."""
+        values = np.array([(color.r_add, color.g_add, color.b_add,
+                            color.a_mul * 255, color.r_mul * 255, color.g_mul * 255, color.b_mul * 255)
+                           for color in self.color_transforms], dtype=np.float64).reshape(-1, 7)
+        values = np.round(values)
+
+        if not ((values >= 0) & (values <= 255)).all():
+            Console.error(f"MatrixBank {self.index} has color transform values out of 0-255 range! Aborting...")
+            raise TypeError()
 
-        self.write_ushort(len(self.matrices))
-        self.write_ushort(len(self.color_transforms))
+        records = np.empty(len(self.color_transforms), COLOR_TRANSFORM_TAG_RECORD)
+        records["tag"] = 9
+        records["length"] = 7
+        records["values"] = values
 
-        return 42, self.buffer
+        swf.writer.write(records.tobytes())
@@ -4,6 +4,8 @@ from lib.console import Console
 
 from .writable import Writable
 
+import numpy as np
+
 
 # all blend modes used in Supercell games
 BLENDMODES = [
@@ -19,6 +21,20 @@ BLENDMODES = [
 ]
 
 
+FRAME_ELEMENT_DTYPE = np.dtype([("bind", "<u2"), ("matrix", "<u2"), ("color", "<u2")])
+
+
+def find_unchanged_elements(elements, offsets):
+    """Returns mask of elements that previous frame has too, with the same matrix and color."""
+    frames = np.repeat(np.arange(len(offsets) - 1, dtype=np.uint64), np.diff(offsets))
+
+    # element fields and frame index packed into one 64-bit key
+    packed = (elements["bind"].astype(np.uint64) << 32) | (elements["matrix"].astype(np.uint64) << 16) | elements["color"]
+    keys = (frames << 48) | packed
+
+    return (frames > 0) & np.isin(keys - np.uint64(1 << 48), keys)
+
+
 class Modifier(Enum):
     Mask = 38
     Masked = 39
@@ -35,22 +51,22 @@ class MovieClipModifier(Writable):
 
         return swf.reader.read_ushort()
 
-    def save(self, id: int):
-        super().save()
+    def save(self, swf, id: int):
+        swf.writer.write_tag(self.modifier.value, id.to_bytes(2, "little"))
 
-        self.write_ushort(id)
-
-        tag = self.modifier.value
-
-        return tag, self.buffer
+    def get_key(self):
+        return self.modifier
 
     def __eq__(a, b):
         if type(a) == type(b):
-            if a.modifier == b.modifier:
+            if a.get_key() == b.get_key():
                 return True
 
         return False
 
+    def __hash__(self):
+        return hash(self.get_key())
+
 
 class MovieClip(Writable):
 
@@ -82,18 +98,10 @@ class MovieClip(Writable):
             raise TypeError()
 
 
-        frame_elements = []
         frame_elements_count = swf.reader.read_int()
-        for x in range(frame_elements_count):
-            bind_index = swf.reader.read_ushort()
-            matrix_index = swf.reader.read_ushort()
-            color_index = swf.reader.read_ushort()
-
-            frame_elements.append({
-                "bind": bind_index,
-                "matrix": matrix_index,
-                "color": color_index
-            })
+
+        # elements of all frames are kept in one array and every frame gets a view into it
+        frame_elements = swf.reader.read_array(FRAME_ELEMENT_DTYPE, frame_elements_count).copy()
 
         binds_count = swf.reader.read_ushort()
 
@@ -128,8 +136,7 @@ class MovieClip(Writable):
                 
                 elements_count = self.frames[frames_loaded].load(swf)
 
-                for x in range(elements_count):
-                    self.frames[frames_loaded].elements.append(frame_elements[frame_elements_offset + x])
+                self.frames[frames_loaded].elements = frame_elements[frame_elements_offset:frame_elements_offset + elements_count]
                 frame_elements_offset += elements_count
 
                 frames_loaded += 1
@@ -148,75 +155,81 @@ class MovieClip(Writable):
 
         return id
 
-    def save(self, id: int, ids: list):
-        super().save()
+    def save(self, swf, id: int, ids: list):
+        tag_start = swf.writer.begin_tag()
 
-        self.write_ushort(id)
-        self.write_uchar(self.frame_rate)
-        self.write_ushort(len(self.frames))
+        swf.writer.write_ushort(id)
+        swf.writer.write_uchar(self.frame_rate)
+        swf.writer.write_ushort(len(self.frames))
 
-        frame_elements = []
-        for frame in self.frames:
-            for element in frame.elements:
-                frame_elements.append(element)
+        frame_elements, _ = self.get_elements()
 
-        self.write_int(len(frame_elements))
-        for element in frame_elements:
-            self.write_ushort(element["bind"])
-            self.write_ushort(element["matrix"])
-            self.write_ushort(element["color"])
+        swf.writer.write_int(len(frame_elements))
+        swf.writer.write(frame_elements.tobytes())
 
-        self.write_ushort(len(self.binds))
+        swf.writer.write_ushort(len(self.binds))
 
         for bind in self.binds:
-            self.write_ushort(ids[bind["id"]])
+            swf.writer.write_ushort(ids[bind["id"]])
 
         for bind in self.binds:
-            self.write_uchar(BLENDMODES.index(bind["blend"]) & 0x3F)
+            swf.writer.write_uchar(BLENDMODES.index(bind["blend"]) & 0x3F)
 
         for bind in self.binds:
-            self.write_ascii(bind["name"])
+            swf.writer.write_ascii(bind["name"])
 
         if self.matrix_bank > 0:
-            self.write_uchar(41)
-            self.write_int(1)
-            self.write_uchar(self.matrix_bank)
+            swf.writer.write_tag(41, self.matrix_bank.to_bytes(1, "little"))
 
         for frame in self.frames:
-            tag_frame, buffer = frame.save()
-
-            self.write_uchar(tag_frame)
-            self.write_int(len(buffer))
-            self.write(buffer)
+            frame.save(swf)
 
         if self.nine_slice:
-            self.write_uchar(31)
-            self.write_int(16)
+            nine_slice_start = swf.writer.begin_tag()
 
             x, y, width, height = self.nine_slice
-            self.write_twip(x)
-            self.write_twip(y)
-            self.write_twip(width)
-            self.write_twip(height)
+            swf.writer.write_twip(x)
+            swf.writer.write_twip(y)
+            swf.writer.write_twip(width)
+            swf.writer.write_twip(height)
 
-        self.write(bytes(5))  # end tag for frame tags array
+            swf.writer.end_tag(nine_slice_start, 31)
+
+        swf.writer.write(bytes(5))  # end tag for frame tags array
 
         # TODO: add support for tag 35 (idk where difference, but it's also used in games)
-        return 12, self.buffer
+        swf.writer.end_tag(tag_start, 12)
+
+    def get_elements(self):
+        """Returns elements of all frames as one array and offsets of frames in it, with end offset last."""
+        offsets = np.zeros(len(self.frames) + 1, np.int64)
+        offsets[1:] = np.cumsum([len(frame.elements) for frame in self.frames], dtype=np.int64)
+
+        elements = np.concatenate([np.empty(0, FRAME_ELEMENT_DTYPE)] + [frame.elements for frame in self.frames])
+
+        return elements, offsets
+
+    def get_key(self):
+        return (self.frame_rate,
+                tuple((bind["id"], bind["blend"], bind.get("name")) for bind in self.binds),
+                tuple(frame.get_key() for frame in self.frames),
+                tuple(self.nine_slice),
+                self.matrix_bank)
 
     def __eq__(a, b):
         if type(a) == type(b):
-            if a.frame_rate == b.frame_rate\
-                    and a.binds == b.binds\
-                    and a.frames == b.frames\
-                    and a.nine_slice == b.nine_slice\
-                    and a.matrix_bank == b.matrix_bank:
+            if a.get_key() == b.get_key():
                 return True
 
         return False
+
+    def __hash__(self):
+        return hash(self.get_key())
+
+
 class MovieClipFrame(Writable):
     def __init__(self) -> None:
-        self.elements: list = []
+        self.elements: np.ndarray = np.empty(0, FRAME_ELEMENT_DTYPE)
         self.name: str = None
 
     def load(self, swf):
@@ -225,15 +238,24 @@ class MovieClipFrame(Writable):
 
         return elements_count
 
-    def save(self):
-        super().save()
+    def save(self, swf):
+        tag_start = swf.writer.begin_tag()
+
+        swf.writer.write_ushort(len(self.elements))
+        swf.writer.write_ascii(self.name)
 
-        self.write_ushort(len(self.elements))
-        self.write_ascii(self.name)
+        swf.writer.end_tag(tag_start, 11)
 
-        return 11, self.buffer
+    def get_key(self):
+        return (self.name,
+                tuple(self.elements.tolist()))
 
     def __eq__(a, b):
-        if a.name == b.name\
-                and a.elements == b.elements:
-            return False
+        if type(a) == type(b):
+            if a.get_key() == b.get_key():
+                return True
+
+        return False
+
+    def __hash__(self):
+        return hash(self.get_key())
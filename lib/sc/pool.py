@@ -0,0 +1,28 @@
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+
+_context = None
+
+
+def init_worker(context):
+    global _context
+    _context = context
+
+
+def run_chunk(function, chunk: list):
+    return function(_context, chunk)
+
+
+def map_chunks(function, jobs: list, context, processes: int = None):
+    """Calls function(context, chunk) for chunks of jobs in a process pool and returns results of chunks in order.
+    Context is sent to each worker process once, when it starts."""
+    processes = processes or os.cpu_count() or 1
+
+    # a few chunks per worker keeps them busy when jobs take uneven time
+    chunk_size = max(1, -(-len(jobs) // (processes * 4)))
+    chunks = [jobs[x:x + chunk_size] for x in range(0, len(jobs), chunk_size)]
+
+    with ProcessPoolExecutor(processes, initializer=init_worker, initargs=(context,)) as executor:
+        return list(executor.map(run_chunk, [function] * len(chunks), chunks))
@@ -0,0 +1,56 @@
+from lib.utils import BinaryWriter
+
+from .movieclip import MovieClip
+from .pool import map_chunks
+
+
+class TextureHeader:
+    """Texture fields that resources need while saving, without pixel data."""
+
+    def __init__(self, texture) -> None:
+        self.width: int = texture.width
+        self.height: int = texture.height
+
+        self.mag_filter: str = texture.mag_filter
+        self.min_filter: str = texture.min_filter
+
+
+class SaveContext:
+    """Stand-in for SupercellSWF that resources are saved with in worker processes."""
+
+    def __init__(self, textures: list, id_list: dict) -> None:
+        self.textures = textures
+        self.id_list = id_list
+
+        self.writer: BinaryWriter = None
+
+
+def save_chunk(context: SaveContext, chunk: list):
+    context.writer = BinaryWriter()
+
+    ends = []
+    for resource, id in chunk:
+        if isinstance(resource, MovieClip):
+            resource.save(context, id, context.id_list)
+        else:
+            resource.save(context, id)
+
+        ends.append(context.writer.tell())
+
+    return context.writer.buffer, ends
+
+
+def serialize_resources(textures: list, jobs: list, id_list: dict, processes: int = None):
+    """Saves (resource, id) pairs in a process pool and returns tag bytes of each of them in the same order."""
+    context = SaveContext([TextureHeader(texture) for texture in textures], id_list)
+
+    serialized = []
+    for buffer, ends in map_chunks(save_chunk, jobs, context, processes):
+        view = memoryview(buffer)
+
+        start = 0
+        for end in ends:
+            serialized.append(view[start:end])
+            start = end
+
+    return serialized
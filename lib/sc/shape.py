@@ -1,4 +1,4 @@
-from math import ceil, degrees, radians, atan2, cos, sin
+from math import degrees, radians, atan2, cos, sin
 
 from lib.console import Console
 
@@ -64,11 +64,6 @@ class Shape(Writable):
         return id
 
     def save(self, swf, id: int):
-        super().save()
-
-        self.write_ushort(id)
-        self.write_ushort(len(self.bitmaps))
-
         points_count = 0
         max_rects_count = 0
         for bitmap in self.bitmaps:
@@ -78,27 +73,34 @@ class Shape(Writable):
 
         tag = 2 if max_rects_count == len(self.bitmaps) else 18
 
+        tag_start = swf.writer.begin_tag()
+
+        swf.writer.write_ushort(id)
+        swf.writer.write_ushort(len(self.bitmaps))
+
         # allocator?
         if tag == 18:
-            self.write_ushort(points_count)
+            swf.writer.write_ushort(points_count)
 
         for bitmap in self.bitmaps:
-            tag_bitmap, buffer = bitmap.save(swf)
+            bitmap.save(swf)
 
-            self.write_uchar(tag_bitmap)
-            self.write_int(len(buffer))
-            self.write(buffer)
+        swf.writer.write(bytes(5))  # end tag for bitmap tags array
 
-        self.write(bytes(5))  # end tag for bitmap tags array
+        swf.writer.end_tag(tag_start, tag)
 
-        return tag, self.buffer
+    def get_key(self):
+        return tuple(bitmap.get_key() for bitmap in self.bitmaps)
 
     def __eq__(a, b):
         if type(a) == type(b):
-            if a.bitmaps == b.bitmaps:
+            if a.get_key() == b.get_key():
                 return True
         return False
 
+    def __hash__(self):
+        return hash(self.get_key())
+
 
 class ShapeDrawBitmapCommand(Writable):
     def __init__(self) -> None:
@@ -114,58 +116,51 @@ class ShapeDrawBitmapCommand(Writable):
         self.max_rects = tag == 4
         points_count = 4 if self.max_rects else swf.reader.read_uchar()
 
-        for i in range(points_count):
-            x = swf.reader.read_twip()
-            y = swf.reader.read_twip()
-            self.xy_coords.append([x, y])
-
-        for i in range(points_count):
-            w = swf.reader.read_ushort()
-            h = swf.reader.read_ushort()
+        self.xy_coords = swf.reader.read_twips(points_count * 2).reshape(-1, 2).tolist()
 
-            if tag == 22:
-                w = w / 0xFFFF * swf.textures[self.texture_index].width
-                h = h / 0xFFFF * swf.textures[self.texture_index].height
-
-            u, v = [ceil(i) for i in [w, h]]
+        uv_coords = swf.reader.read_ushorts(points_count * 2).reshape(-1, 2)
+        if tag == 22:
+            texture = swf.textures[self.texture_index]
+            uv_coords = np.ceil(uv_coords / 0xFFFF * (texture.width, texture.height))
 
-            self.uv_coords.append([u, v])
+        self.uv_coords = uv_coords.astype(int).tolist()
     def save(self, swf):
-        super().save()
-
         tag = 4 if self.max_rects else 22
         points_count = 4 if self.max_rects else len(self.xy_coords)
 
-        self.write_uchar(self.texture_index)
-
-        if not self.max_rects:
-            self.write_uchar(points_count)
+        texture = swf.textures[self.texture_index]
 
-        if (swf.textures[self.texture_index].mag_filter, swf.textures[self.texture_index].min_filter) == (
-                "GL_NEAREST", "GL_NEAREST") and not self.max_rects:
+        if (texture.mag_filter, texture.min_filter) == ("GL_NEAREST", "GL_NEAREST") and not self.max_rects:
             tag = 17
 
+        tag_start = swf.writer.begin_tag()
+
+        swf.writer.write_uchar(self.texture_index)
+
+        if not self.max_rects:
+            swf.writer.write_uchar(points_count)
+
         for coord in self.xy_coords[:points_count]:
             x, y = coord
 
-            self.write_twip(x)
-            self.write_twip(y)
+            swf.writer.write_twip(x)
+            swf.writer.write_twip(y)
 
         for coord in self.uv_coords[:points_count]:
             u, v = coord
 
             if tag == 22:
-                u *= 0xFFFF / swf.textures[self.texture_index].width
-                v *= 0xFFFF / swf.textures[self.texture_index].height
+                u *= 0xFFFF / texture.width
+                v *= 0xFFFF / texture.height
 
-            self.write_ushort(int(u))
-            self.write_ushort(int(v))
+            swf.writer.write_ushort(int(u))
+            swf.writer.write_ushort(int(v))
 
-        return tag, self.buffer
+        swf.writer.end_tag(tag_start, tag)
 
     def get_image(self, swf) -> Image:
         texture = swf.textures[self.texture_index]
-        image = texture.get_image()
+        pixels = texture.get_pixels()
 
         w, h = self.get_size(self.uv_coords)
         if w == 0:
@@ -175,29 +170,31 @@ class ShapeDrawBitmapCommand(Writable):
 
         if w + h == 2:
             x, y = self.uv_coords[-1]
-            return Image.new(texture.image.mode, (1, 1), texture.image.getpixel((x, y)))
-
-        mask = Image.new("L", (texture.width, texture.height), 0)
-
-        color = 255
-        ImageDraw.Draw(mask).polygon([(x, y) for x, y in self.uv_coords], fill=color)
+            return Image.fromarray(pixels[y:y + 1, x:x + 1])
 
         left = min(x for x, _ in self.uv_coords)
         top = min(y for _, y in self.uv_coords)
-        right = max(x for x, _ in self.uv_coords)
-        bottom = max(y for _, y in self.uv_coords)
 
-        if w == 1:
-            right += 1
-        if h == 1:
-            bottom += 1
+        # polygon is rasterized only inside its bounding box, in sprite coordinates,
+        # with one more row and column so that no edge gets clipped by the mask
+        mask = Image.new("L", (w + 1, h + 1), 0)
+        ImageDraw.Draw(mask).polygon([(x - left, y - top) for x, y in self.uv_coords], fill=255)
 
-        bbox = left, top, right, bottom
+        sprite = np.zeros((h, w, *pixels.shape[2:]), pixels.dtype)
 
-        sprite = Image.new(image.mode, (w, h))
-        sprite.paste(image.crop(bbox), (0, 0), mask.crop(bbox))
+        # parts of bounding box outside of texture stay transparent
+        region_left, region_top = max(left, 0), max(top, 0)
+        region_right, region_bottom = min(left + w, texture.width), min(top + h, texture.height)
 
-        return sprite
+        if region_left < region_right and region_top < region_bottom:
+            region = (slice(region_top - top, region_bottom - top), slice(region_left - left, region_right - left))
+            inside = np.asarray(mask)[region] != 0
+            if sprite.ndim == 3:
+                inside = inside[..., None]
+
+            np.copyto(sprite[region], pixels[region_top:region_bottom, region_left:region_right], where=inside)
+
+        return Image.fromarray(sprite)
 
     def get_matrix(self, custom_uv_coords: list = None, use_nearest: bool = False):
         uv_coords = custom_uv_coords or self.uv_coords
@@ -372,10 +369,17 @@ class ShapeDrawBitmapCommand(Writable):
 
         return uv_x / xy_x, uv_y / xy_y
 
+    def get_key(self):
+        return (self.texture_index,
+                self.max_rects,
+                tuple(tuple(point) for point in self.xy_coords),
+                tuple(tuple(point) for point in self.uv_coords))
+
     def __eq__(a, b):
-        if a.max_rects == b.max_rects\
-                and a.uv_coords == b.uv_coords\
-                and a.xy_coords == b.xy_coords\
-                and a.texture_index == b.texture_index:
-            return True
+        if type(a) == type(b):
+            if a.get_key() == b.get_key():
+                return True
         return False
+
+    def __hash__(self):
+        return hash(self.get_key())
@@ -0,0 +1,95 @@
+import os
+
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from PIL import Image
+
+from .shape import ShapeDrawBitmapCommand
+from .pool import map_chunks
+
+# counterclockwise right angle rotations, which are done losslessly by transposing pixels
+RIGHT_ANGLE_TRANSPOSES = {
+    90: Image.Transpose.ROTATE_90,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_270
+}
+
+
+class SharedTexture:
+    """Texture pixels placed in shared memory, so that worker processes read them without a copy."""
+
+    def __init__(self, pixels: np.ndarray) -> None:
+        self.height, self.width = pixels.shape[:2]
+
+        self.shape: tuple = pixels.shape
+        self.dtype: str = pixels.dtype.str
+
+        self.memory = SharedMemory(create=True, size=max(1, pixels.nbytes))
+        self.get_pixels()[...] = pixels
+
+    def get_pixels(self):
+        return np.ndarray(self.shape, self.dtype, buffer=self.memory.buf)
+
+    def release(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+class ExtractContext:
+    """Textures of a worker process, read by ShapeDrawBitmapCommand.get_image in place of SupercellSWF textures."""
+
+    def __init__(self, textures: list) -> None:
+        self.textures = textures
+
+
+def extract_chunk(context: ExtractContext, chunk: list):
+    return [extract_sprite(context, job) for job in chunk]
+
+
+def extract_sprite(swf, job: tuple) -> Image:
+    """Cuts out (texture_index, uv_coords, rotation, mirror) sprite, turned and flipped as it is placed in shape."""
+    texture_index, uv_coords, rotation, mirror = job
+
+    bitmap = ShapeDrawBitmapCommand()
+    bitmap.texture_index = texture_index
+    bitmap.uv_coords = uv_coords
+
+    sprite = bitmap.get_image(swf)
+
+    rotation = -rotation % 360
+    if rotation in RIGHT_ANGLE_TRANSPOSES:
+        sprite = sprite.transpose(RIGHT_ANGLE_TRANSPOSES[rotation])
+    elif rotation:
+        sprite = sprite.rotate(rotation, expand=True)
+
+    if mirror:
+        sprite = sprite.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+
+    return sprite
+
+
+def extract_sprites(swf, jobs: list, processes: int = None):
+    """Extracts sprites of jobs in a process pool and returns them in the same order."""
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1 or len(jobs) < 2:
+        return [extract_sprite(swf, job) for job in jobs]
+
+    used_textures = {texture_index for texture_index, _, _, _ in jobs}
+
+    textures = [None] * len(swf.textures)
+    try:
+        for texture_index in used_textures:
+            textures[texture_index] = SharedTexture(swf.textures[texture_index].get_pixels())
+
+        sprites = []
+        for chunk_sprites in map_chunks(extract_chunk, jobs, ExtractContext(textures), processes):
+            sprites.extend(chunk_sprites)
+
+    finally:
+        for texture in textures:
+            if texture is not None:
+                texture.release()
+
+    return sprites
@@ -1,5 +1,12 @@
 import copy
 import os
+import time
+
+from struct import Struct
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 from lib.utils import BinaryReader, BinaryWriter
 
@@ -7,13 +14,21 @@ from lib.utils import BinaryReader, BinaryWriter
 from .texture import SWFTexture
 from .shape import Shape
 from .text_field import TextField
-from .matrix_bank import MatrixBank, Matrix
+from .matrix_bank import MatrixBank, Matrix, Color
 from .movieclip import MovieClipModifier, MovieClip
+from .lazy import TagRecord, LazyResources, LazyTextures
+
+from .compression import decompress_file, compress
+from .cache import DecompressionCache
+from .serializer import serialize_resources
+
+
+from lib.console import Console, Time
+
+
+USHORT = Struct("<H")
 
-from sc_compression.signatures import Signatures
-from sc_compression import Decompressor, Compressor
 
-from lib.console import Console
 class SupercellSWF:
 
     TEXTURE_EXTENSION = "_tex.sc"
@@ -54,96 +69,218 @@ class SupercellSWF:
 
         self.has_external_texture: bool = None
 
+        self.lazy: bool = False
+
+        # Optional on-disk cache of decompressed payloads, disabled by default
+        self.cache: DecompressionCache = None
+
         self.textures: list = []
         self.matrix_banks: list = [MatrixBank()]
         self.resources: dict = {}
 
         self.exports: dict = {}
 
+        # compression backend of saved files (lzma, lzham or zstd), its level and ZSTD compression threads,
+        # -1 is one thread per CPU and 0 compresses in calling thread
+        self.compression_signature: str = "lzma"
+        self.compression_level: int = None
+        self.compression_threads: int = -1
+
+        # None halves lowres textures with a 2x2 box filter, otherwise it is a PIL.Image.Resampling filter
+        self.texture_downscale_filter: int = None
+
         self.highres_texture_postfix: str = "_highres"
         self.lowres_texture_postfix: str = "_lowres"
 
         self.reader: BinaryReader = None
         self.writer: BinaryWriter = None
     
-    def load(self, filepath: str):
+    def load(self, filepath: str, lazy: bool = False, parallel: bool = True):
         Console.info(f"Reading {filepath} SupercellFlash asset file...")
-        print()
+        Console.newline()
 
         self.filename = filepath
 
-        self.load_internal(filepath, False)
+        # In lazy mode tags are only indexed and every resource or texture is decoded on its first access
+        self.lazy = lazy
+        if self.lazy:
+            self.resources = LazyResources(self)
 
-        if self.has_external_texture:
-            texture_filename = os.path.splitext(self.filename)[0] + self.TEXTURE_EXTENSION
-            highres_path = f"{os.path.splitext(self.filename)[0]}{self.highres_texture_postfix}{self.TEXTURE_EXTENSION}"
-            lowres_path = f"{os.path.splitext(self.filename)[0]}{self.lowres_texture_postfix}{self.TEXTURE_EXTENSION}"
+        if not parallel:
+            self.load_internal(filepath, False)
 
-            if self.use_uncommon_texture:
-                if os.path.isfile(highres_path):
-                    self.load_internal(highres_path, True)
-                elif os.path.isfile(lowres_path):
-                    Console.warning(f"Cannot find higrhes texture file {highres_path} for {self.filename}. Skipping...")
-                    self.load_internal(lowres_path, True)
+            if self.has_external_texture:
+                if self.lazy:
+                    self.textures.external_texture_source = filepath
                 else:
-                    Console.error(
-                        f"Cannot find any external texture file asset for {self.filename}! Textures not loaded! Aborting...")
-                    raise TypeError()
+                    self.load_internal(self.get_texture_file(filepath), True)
 
-            else:
-                if self.use_lowres_texture:
-                    if not os.path.exists(texture_filename) and os.path.exists(lowres_path):
-                        Console.info(
-                            f"Cannot find external texture file {texture_filename} for {self.filename}! Loading lowres texture asset...")
-                        self.load_internal(lowres_path, True)
-
-                if os.path.exists(texture_filename):
-                    self.load_internal(texture_filename, True)
-                else:
-                    Console.error(f"Cannot find external texture file {texture_filename} for {self.filename}! Textures not loaded! Aborting...")
-                    raise TypeError()
+            return
 
+        # External texture file is decompressed and decoded in a worker thread while main file tags are parsed
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.load_header(filepath)
+            self.read_texture_tags()
 
+            textures = None
+            if self.has_external_texture and not self.lazy:
+                textures = executor.submit(self.load_texture_file, self.get_texture_file(filepath))
 
-    def load_internal(self, filepath: str, is_texture: bool):
-        with open(filepath, 'rb') as file:
-            compressed = file.read().split(b"START")[0] # TODO: Vorono4ka, fix your sc-compression please...
+            self.load_tags()
 
-            decompressor = Decompressor()
-            self.reader = BinaryReader(decompressor.decompress(compressed))
+            if textures is not None:
+                Console.info("Waiting for external texture asset file...")
+                self.join_textures(textures.result())
 
-        if not is_texture:
-            Console.info("Reading main asset file...")
+            elif self.has_external_texture:
+                # in lazy mode external texture file is found and read only on first texture access
+                self.textures.external_texture_source = filepath
 
-            self.shapes_count = self.reader.read_ushort()
-            self.movieclips_count = self.reader.read_ushort()
-            self.textures_count = self.reader.read_ushort()
-            self.text_fields_count = self.reader.read_ushort()
+    def get_texture_file(self, filepath: str):
+        """Returns external texture file of given main file that is used with current texture flags."""
+        texture_filename = os.path.splitext(filepath)[0] + self.TEXTURE_EXTENSION
+        highres_path = f"{os.path.splitext(filepath)[0]}{self.highres_texture_postfix}{self.TEXTURE_EXTENSION}"
+        lowres_path = f"{os.path.splitext(filepath)[0]}{self.lowres_texture_postfix}{self.TEXTURE_EXTENSION}"
 
-            self.matrix_banks[-1].load(self)
+        if self.use_uncommon_texture:
+            if os.path.isfile(highres_path):
+                return highres_path
+            elif os.path.isfile(lowres_path):
+                Console.warning(f"Cannot find higrhes texture file {highres_path} for {filepath}. Skipping...")
+                return lowres_path
 
-            self.reader.skip(5)  # unused
+            Console.error(
+                f"Cannot find any external texture file asset for {filepath}! Textures not loaded! Aborting...")
+            raise TypeError()
 
-            exports_count = self.reader.read_ushort()
+        if os.path.exists(texture_filename):
+            return texture_filename
 
-            export_ids = [self.reader.read_ushort() for x in range(exports_count)]
-            self.exports = {id: [] for id in export_ids}
-            
-            for export_id in export_ids:
-                export_name = self.reader.read_ascii()
+        if self.use_lowres_texture and os.path.exists(lowres_path):
+            Console.info(
+                f"Cannot find external texture file {texture_filename} for {filepath}! Loading lowres texture asset...")
+            return lowres_path
 
-                self.exports[export_id].append(export_name)
-            
-            print()
-            
-            self.textures = [_class() for _class in [SWFTexture] * self.textures_count]
-        
-        else:
-            Console.info("Reading external texture asset file...")
-            print()
+        Console.error(f"Cannot find external texture file {texture_filename} for {filepath}! Textures not loaded! Aborting...")
+        raise TypeError()
 
+    def load_internal(self, filepath: str, is_texture: bool):
+        if is_texture:
+            self.join_textures(self.load_texture_file(filepath))
+            return
+
+        self.load_header(filepath)
         self.load_tags()
 
+    def load_header(self, filepath: str):
+        self.reader = BinaryReader(self.decompress_file(filepath))
+
+        Console.info("Reading main asset file...")
+
+        self.shapes_count = self.reader.read_ushort()
+        self.movieclips_count = self.reader.read_ushort()
+        self.textures_count = self.reader.read_ushort()
+        self.text_fields_count = self.reader.read_ushort()
+
+        self.matrix_banks[-1].load(self)
+
+        self.reader.skip(5)  # unused
+
+        exports_count = self.reader.read_ushort()
+
+        export_ids = [self.reader.read_ushort() for x in range(exports_count)]
+        self.exports = {id: [] for id in export_ids}
+
+        for export_id in export_ids:
+            export_name = self.reader.read_ascii()
+
+            self.exports[export_id].append(export_name)
+
+        Console.newline()
+
+        self.textures = [_class() for _class in [SWFTexture] * self.textures_count]
+        if self.lazy:
+            self.textures = LazyTextures(self, self.textures)
+
+    def read_texture_tags(self):
+        """Reads external texture flags and texture postfixes ahead of other tags, without moving reader."""
+        position = self.reader.tell()
+
+        while True:
+            tag = self.reader.read_uchar()
+            tag_length = self.reader.read_int()
+            tag_end = self.reader.tell() + tag_length
+
+            if tag == SupercellSWF.END_TAG:
+                break
+
+            if tag == SupercellSWF.USE_LOWRES_TEXTURE_TAG:
+                self.use_lowres_texture = True
+
+            elif tag == SupercellSWF.USE_EXTERNAL_TEXTURE_TAG:
+                self.has_external_texture = True
+
+            elif tag == SupercellSWF.USE_UNCOMMON_RESOLUTION_TAG:
+                self.use_uncommon_texture = True
+                self.use_lowres_texture = True
+
+            elif tag == SupercellSWF.TEXTURE_POSTFIXS_TAG:
+                self.highres_texture_postfix = self.reader.read_ascii()
+                self.lowres_texture_postfix = self.reader.read_ascii()
+
+            self.reader.seek(tag_end)
+
+        self.reader.seek(position)
+
+    def load_texture_file(self, filepath: str):
+        """Reads all textures of an external texture file. Does not touch state of this SupercellSWF."""
+        Console.info(f"Reading external texture asset file {filepath}...")
+
+        texture_swf = SupercellSWF()
+        texture_swf.filename = filepath
+        texture_swf.lazy = self.lazy
+        texture_swf.reader = BinaryReader(self.decompress_file(filepath))
+
+        textures = []
+        while True:
+            tag = texture_swf.reader.read_uchar()
+            tag_length = texture_swf.reader.read_int()
+
+            if tag == SupercellSWF.END_TAG:
+                break
+
+            if tag in SupercellSWF.TEXTURE_TAGS:
+                if self.lazy:
+                    textures.append(texture_swf.index_tag(SWFTexture, tag, tag_length, False))
+                else:
+                    texture = SWFTexture()
+                    texture.load(texture_swf, tag, False)
+                    textures.append(texture)
+
+                continue
+
+            Console.warning(f"{filepath} has unknown tag {tag} with length {tag_length}! Skipped...")
+            texture_swf.reader.skip(tag_length)
+
+        return textures
+
+    def decompress_file(self, filepath: str):
+        if self.cache is not None:
+            return self.cache.decompress_file(filepath)
+
+        return decompress_file(filepath)
+
+    def compress(self, data):
+        return compress(data, self.compression_signature, self.compression_level, self.compression_threads)
+
+    def join_textures(self, textures: list):
+        if len(textures) > self.textures_count:
+            Console.error("Trying to load too many SWFTextures! Aborting...")
+            raise TypeError()
+
+        for index, texture in enumerate(textures):
+            self.textures[index] = texture
+
     def load_tags(self):
         has_external_texture = False
 
@@ -162,9 +299,9 @@ class SupercellSWF:
             tag_length = self.reader.read_int()
 
             if tag == SupercellSWF.END_TAG:
-                print()
+                Console.newline()
                 Console.info("End tag.")
-                print()
+                Console.newline()
                 Console.info("Reading completed.")
 
                 break
@@ -191,7 +328,10 @@ class SupercellSWF:
                 continue
 
             elif tag in SupercellSWF.TEXTURE_TAGS:
-                self.textures[textures_loaded].load(self, tag, has_external_texture)
+                if self.lazy:
+                    self.textures[textures_loaded] = self.index_tag(SWFTexture, tag, tag_length, has_external_texture)
+                else:
+                    self.textures[textures_loaded].load(self, tag, has_external_texture)
 
                 textures_loaded += 1
                 if textures_loaded > self.textures_count:
@@ -205,10 +345,10 @@ class SupercellSWF:
                 continue
 
             elif tag in SupercellSWF.MOVIECLIP_MODIFIER_TAGS:
-                movieclip_modifier = MovieClipModifier()
-                id = movieclip_modifier.load(self, tag)
-
-                self.resources[id] = movieclip_modifier
+                if self.lazy:
+                    self.index_resource(MovieClipModifier, tag, tag_length)
+                else:
+                    self.load_resource(MovieClipModifier, tag, tag_length)
 
                 movieclip_modifiers_loaded += 1
                 if movieclip_modifiers_loaded > self.movieclip_modifiers_count:
@@ -219,10 +359,10 @@ class SupercellSWF:
 
             elif tag in SupercellSWF.SHAPE_TAGS:
                 Console.progress_bar("Shapes loading...", shapes_loaded, self.shapes_count)
-                shape = Shape()
-                id = shape.load(self, tag)
-
-                self.resources[id] = shape
+                if self.lazy:
+                    self.index_resource(Shape, tag, tag_length)
+                else:
+                    self.load_resource(Shape, tag, tag_length)
 
                 shapes_loaded += 1
                 if shapes_loaded > self.shapes_count:
@@ -233,10 +373,10 @@ class SupercellSWF:
 
             elif tag in SupercellSWF.TEXT_FIELD_TAGS:
                 Console.progress_bar("Text fields loading...", text_fields_loaded, self.text_fields_count)
-                text_field = TextField()
-                id = text_field.load(self, tag)
-
-                self.resources[id] = text_field
+                if self.lazy:
+                    self.index_resource(TextField, tag, tag_length)
+                else:
+                    self.load_resource(TextField, tag, tag_length)
 
                 text_fields_loaded += 1
                 if text_fields_loaded > self.text_fields_count:
@@ -256,33 +396,23 @@ class SupercellSWF:
                 continue
 
             elif tag in SupercellSWF.MATRIX_TAGS:
-                Console.progress_bar("Matrices loading...", matrices_loaded, self.matrix_banks[-1].matrices_count)
+                matrices_loaded += self.matrix_banks[-1].load_matrices(self, matrices_loaded)
+                Console.progress_bar("Matrices loading...", matrices_loaded - 1, self.matrix_banks[-1].matrices_count)
 
-                self.matrix_banks[-1].matrices[matrices_loaded].load(self, tag)
-
-                matrices_loaded += 1
-                if matrices_loaded == self.matrix_banks[-1].matrices_count:
-                    print()
-                
                 continue
 
             elif tag == SupercellSWF.COLOR_TRANSFORM_TAG:
-                Console.progress_bar("ColorTransforms loading...", color_transforms_loaded, self.matrix_banks[-1].color_transforms_count)
-
-                self.matrix_banks[-1].color_transforms[color_transforms_loaded].load(self, tag)
+                color_transforms_loaded += self.matrix_banks[-1].load_color_transforms(self, color_transforms_loaded)
+                Console.progress_bar("ColorTransforms loading...", color_transforms_loaded - 1, self.matrix_banks[-1].color_transforms_count)
 
-                color_transforms_loaded += 1
-                if color_transforms_loaded == self.matrix_banks[-1].color_transforms_count:
-                    print()
-                
                 continue
 
             elif tag in SupercellSWF.MOVIECLIP_TAGS:
                 Console.progress_bar("Movieclip loading...", movieclips_loaded, self.movieclips_count)
-                movieclip = MovieClip()
-                id = movieclip.load(self, tag)
-
-                self.resources[id] = movieclip
+                if self.lazy:
+                    self.index_resource(MovieClip, tag, tag_length)
+                else:
+                    self.load_resource(MovieClip, tag, tag_length)
 
                 movieclips_loaded += 1
                 if movieclips_loaded > self.movieclips_count:
@@ -294,224 +424,379 @@ class SupercellSWF:
             Console.warning(f"{self.filename} has unknown tag {tag} with length {tag_length}! Skipped...")
             self.reader.skip(tag_length)
     
-    def save(self, filepath: str):
+    def get_matrix(self, movieclip: MovieClip, matrix: Matrix):
+        """Returns index of matrix in the bank of movieclip. Moves movieclip to another bank if its bank is full."""
+        index = self.matrix_banks[movieclip.matrix_bank].get_matrix(matrix)
+
+        if index is None:
+            self.move_to_matrix_bank(movieclip, matrices_count=1)
+            index = self.matrix_banks[movieclip.matrix_bank].get_matrix(matrix)
+
+        return index
+
+    def get_color_transform(self, movieclip: MovieClip, color_transform: Color):
+        """Returns index of color transform in the bank of movieclip. Moves movieclip to another bank if its bank is full."""
+        index = self.matrix_banks[movieclip.matrix_bank].get_color_transform(color_transform)
+
+        if index is None:
+            self.move_to_matrix_bank(movieclip, color_transforms_count=1)
+            index = self.matrix_banks[movieclip.matrix_bank].get_color_transform(color_transform)
+
+        return index
+
+    def move_to_matrix_bank(self, movieclip: MovieClip, matrices_count: int = 0, color_transforms_count: int = 0):
+        """Moves movieclip with transforms of its frames to the last matrix bank,
+        or to a new one if the last bank is its own or can not fit them and given count of new transforms."""
+        bank = self.matrix_banks[movieclip.matrix_bank]
+
+        elements, _ = movieclip.get_elements()
+        matrices = [index for index in np.unique(elements["matrix"]).tolist() if index != 0xFFFF]
+        color_transforms = [index for index in np.unique(elements["color"]).tolist() if index != 0xFFFF]
+
+        matrix_bank = self.matrix_banks[-1]
+        if matrix_bank is bank or not matrix_bank.available_for_matrix(len(matrices) + matrices_count) \
+                or not matrix_bank.available_for_colors(len(color_transforms) + color_transforms_count):
+            matrix_bank = MatrixBank()
+            matrix_bank.index = len(self.matrix_banks)
+            self.matrix_banks.append(matrix_bank)
+
+        # indices of old bank are mapped to indices of the same transforms in new bank, 0xFFFF stays as is
+        matrix_indices = np.arange(0x10000, dtype=np.uint16)
+        for index in matrices:
+            matrix_indices[index] = matrix_bank.get_matrix(bank.matrices[index])
+
+        color_indices = np.arange(0x10000, dtype=np.uint16)
+        for index in color_transforms:
+            color_indices[index] = matrix_bank.get_color_transform(bank.color_transforms[index])
+
+        for frame in movieclip.frames:
+            frame.elements["matrix"] = matrix_indices[frame.elements["matrix"]]
+            frame.elements["color"] = color_indices[frame.elements["color"]]
+
+        movieclip.matrix_bank = matrix_bank.index
+
+    def evict_textures(self):
+        """Drops decoded images of textures that can decode them again on demand. Returns number of dropped images."""
+        evicted = 0
+        for texture in self.textures:
+            if texture.evict():
+                evicted += 1
+
+        return evicted
+
+    def index_tag(self, resource_class, tag: int, tag_length: int, *args):
+        record = TagRecord(resource_class, tag, self.reader.tell(), tag_length, self.reader, args)
+        self.reader.skip(tag_length)
+
+        return record
+
+    def load_resource(self, resource_class, tag: int, tag_length: int):
+        tag_start = self.reader.tell() - 5
+
+        resource = resource_class()
+        id = resource.load(self, tag)
+
+        # original bytes are kept to write resource back as is if it stays unchanged
+        resource.mark_clean(self.reader.get_view(tag_start, tag_start + 5 + tag_length))
+
+        self.resources[id] = resource
+        return id
+
+    def index_resource(self, resource_class, tag: int, tag_length: int):
+        id = self.reader.read_ushort()
+        self.reader.skip(-2)
+
+        record = self.index_tag(resource_class, tag, tag_length)
+        record.id = id
+
+        self.resources[id] = record
+        return id
+
+    def save(self, filepath: str, processes: int = 1):
+        """Saves asset files. With processes other than 1 resources are serialized in a process pool
+        (None means one process per CPU), output is identical to the serial one."""
         Console.info(f"Writing {filepath} SupercellFlash asset file...")
-        print()
+        Console.newline()
 
         self.filename = filepath
 
-        self.save_internal(filepath, False, False)
-
+        # every external texture file is a level of one downscale pyramid: 0 is full size, 1 is halved
+        texture_files = []
         if self.has_external_texture:
             texture_filename = os.path.splitext(self.filename)[0] + self.TEXTURE_EXTENSION
             highres_path = f"{os.path.splitext(self.filename)[0]}{self.highres_texture_postfix}{self.TEXTURE_EXTENSION}"
             lowres_path = f"{os.path.splitext(self.filename)[0]}{self.lowres_texture_postfix}{self.TEXTURE_EXTENSION}"
 
             if self.use_uncommon_texture:
-                self.save_internal(highres_path, True, False)
+                texture_files.append((highres_path, 0))
 
             else:
-                self.save_internal(texture_filename, True, False)
+                texture_files.append((texture_filename, 0))
 
             if self.use_lowres_texture:
-                self.save_internal(lowres_path, True, True)
+                texture_files.append((lowres_path, 1))
+
+        # textures are decoded here, lazy ones can not be decoded from several threads at once
+        textures = list(self.textures)
+
+        # texture files are encoded and compressed in worker threads while main file is written
+        with ThreadPoolExecutor(max_workers=max(len(texture_files), 1)) as executor:
+            texture_saves = [executor.submit(self.save_texture_file, texture_filepath, textures, level)
+                             for texture_filepath, level in texture_files]
+
+            self.save_internal(filepath, False, False, processes)
+
+            for texture_save in texture_saves:
+                texture_save.result()
+
+    def save_texture_file(self, filepath: str, textures: list, level: int):
+        """Writes textures of given pyramid level into an external texture file. Does not touch state of this SupercellSWF."""
+        Console.info(f"Writing external texture asset file {filepath}...")
+
+        texture_swf = SupercellSWF()
+        texture_swf.writer = BinaryWriter()
+
+        levels = textures
+        for _ in range(level):
+            levels = [texture.get_downscaled(self.texture_downscale_filter) for texture in levels]
+
+        for texture in levels:
+            texture.save(texture_swf, False)
+
+        # end tag closes tag list like in main file, readers also stop at the end of buffer without it
+        texture_swf.writer.write(bytes(5))
+
+        with open(filepath, 'wb') as file:
+            file.write(self.compress(texture_swf.writer.buffer))
+
+    def save_internal(self, filepath: str, is_texture: bool, is_lowres: bool, processes: int = 1):
+        if is_texture:
+            self.save_texture_file(filepath, list(self.textures), 1 if is_lowres else 0)
+            return
 
-    def save_internal(self, filepath: str, is_texture: bool, is_lowres: bool):
         self.writer = BinaryWriter()
 
         sorted_resources_id = []
         sorted_resources = []
         id_list = {}
 
-        if not is_texture:
-            Console.info("Writing main asset file...")
-
-            self.textures_count = len(self.textures)
-            self.shapes_count = 0
-            self.movieclips_count = 0
-            self.text_fields_count = 0
-            self.movieclip_modifiers_count = 0
-
-            for resource in self.resources.values():
-                if isinstance(resource, Shape):
-                    self.shapes_count += 1
-                if isinstance(resource, MovieClip):
-                    self.movieclips_count += 1
-                if isinstance(resource, TextField):
-                    self.text_fields_count += 1
-                if isinstance(resource, MovieClipModifier):
-                    self.movieclip_modifiers_count += 1
-
-            self.writer.write_ushort(self.shapes_count)
-            self.writer.write_ushort(self.movieclips_count)
-            self.writer.write_ushort(self.textures_count)
-            self.writer.write_ushort(self.text_fields_count)
-
-            if not self.matrix_banks:
-                self.matrix_banks.append(MatrixBank())
-            
-            matrix_bank = self.matrix_banks[0]
-            _, data = matrix_bank.save()
-            self.writer.write(data)
-
-            self.writer.write(bytes(5)) # unused
-
-            data_struct = [MovieClipModifier,
-                           Shape,
-                           TextField,
-                           MatrixBank,
-                           MovieClip]
-            Console.info("Resource filtering...")
-
-            resources = {}
-
-            id_counter = 0
-            for identifer, resource in self.resources.items():
-                resource_values = list(resources.values())
-                if resource in resource_values:
-                    id_list[identifer] = resources.items()[resource_values.index(resource)]
-                else:
-                    resources[identifer] = resource
-                    id_list[identifer] = id_counter
-                    id_counter += 1
+        Console.info("Writing main asset file...")
 
-            resources_keys = list(resources)
-            resources_values = list(resources.values())
+        Console.info("Resource filtering...")
+        phase_start = time.perf_counter()
 
-            sorted_resources_id = []
-            sorted_resources = (resources_values + sorted(self.matrix_banks, key= lambda x: x.index))
-            sorted_resources.sort(key=lambda x: data_struct.index(type(x)))
+        data_struct = [MovieClipModifier,
+                       Shape,
+                       TextField,
+                       MatrixBank,
+                       MovieClip]
 
-            for resource in sorted_resources:
-                if resource in resources_values:
-                    sorted_resources_id.append(resources_keys[resources_values.index(resource)])
-                else:
-                    sorted_resources_id.append(None)
-
-            export_ids = []
-            export_names = []
-            for export_id in self.exports:
-                for export_name in self.exports[export_id]:
-                    export_ids.append(id_list[export_id])
-                    export_names.append(export_name)
-            
-            self.writer.write_ushort(len(export_ids))
-            
-            for export_id in export_ids:
-                self.writer.write_ushort(export_id)
-            
-            for export_name in export_names:
-                self.writer.write_ascii(export_name)
+        # identical resources are merged into the first one by their content keys in a single pass,
+        # which also puts every unique resource into the bucket of its type
+        first_identifiers = {}
+        duplicates = {}
+        buckets = {resource_class: [] for resource_class in data_struct}
 
-        else:
-            Console.info("Writing external texture asset file...")
-            print()
+        for identifer in self.resources:
+            # lazy resources that were never accessed are not decoded and stay unique
+            resource = self.resources.record(identifer) if self.lazy else None
+
+            if resource is not None:
+                resource_class = resource.resource_class
+                key = (TagRecord, identifer)
+            else:
+                resource = self.resources[identifer]
+                resource_class = type(resource)
+                key = (resource_class, resource.get_key())
+
+            first_identifier = first_identifiers.get(key)
+
+            if first_identifier is not None:
+                duplicates[identifer] = first_identifier
+            else:
+                first_identifiers[key] = identifer
+                buckets[resource_class].append((identifer, resource))
+
+        # new ids keep order of old ones, so already dense ids stay the same and original tags stay valid
+        for id, identifer in enumerate(sorted(first_identifiers.values())):
+            id_list[identifer] = id
 
-        self.save_tags((sorted_resources_id, sorted_resources), id_list, is_texture, is_lowres)
-        print()
+        for identifer, first_identifier in duplicates.items():
+            id_list[identifer] = id_list[first_identifier]
+
+        buckets[MatrixBank] = [(None, matrix_bank) for matrix_bank in sorted(self.matrix_banks, key=lambda x: x.index)]
+
+        for resource_class in data_struct:
+            for identifer, resource in buckets[resource_class]:
+                sorted_resources_id.append(identifer)
+                sorted_resources.append(resource)
+
+        Console.info(f"Resource filtering done in {Time(time.perf_counter() - phase_start)}")
+
+        self.textures_count = len(self.textures)
+        self.shapes_count = len(buckets[Shape])
+        self.movieclips_count = len(buckets[MovieClip])
+        self.text_fields_count = len(buckets[TextField])
+        self.movieclip_modifiers_count = len(buckets[MovieClipModifier])
+
+        self.writer.write_ushort(self.shapes_count)
+        self.writer.write_ushort(self.movieclips_count)
+        self.writer.write_ushort(self.textures_count)
+        self.writer.write_ushort(self.text_fields_count)
+
+        if not self.matrix_banks:
+            self.matrix_banks.append(MatrixBank())
+        
+        matrix_bank = self.matrix_banks[0]
+        self.writer.write_ushort(len(matrix_bank.matrices))
+        self.writer.write_ushort(len(matrix_bank.color_transforms))
+
+        self.writer.write(bytes(5)) # unused
+
+        export_ids = []
+        export_names = []
+        for export_id in self.exports:
+            for export_name in self.exports[export_id]:
+                export_ids.append(id_list[export_id])
+                export_names.append(export_name)
+        
+        self.writer.write_ushort(len(export_ids))
+        
+        for export_id in export_ids:
+            self.writer.write_ushort(export_id)
+        
+        for export_name in export_names:
+            self.writer.write_ascii(export_name)
+
+        phase_start = time.perf_counter()
+        self.save_tags((sorted_resources_id, sorted_resources), id_list, processes)
+        Console.newline()
+        Console.info(f"Tags writing done in {Time(time.perf_counter() - phase_start)}")
 
         with open(filepath, 'wb') as file:
             Console.info("File compressing...")
-            compressor = Compressor()
-            compressed = compressor.compress(self.writer.buffer, Signatures.SC, 1)
+            phase_start = time.perf_counter()
+            compressed = self.compress(self.writer.buffer)
+            Console.info(f"File compressing done in {Time(time.perf_counter() - phase_start)}")
+
             Console.info("Writing to file..")
+            phase_start = time.perf_counter()
             file.write(compressed)
+            Console.info(f"Writing to file done in {Time(time.perf_counter() - phase_start)}")
 
         Console.info("Writing completed.")
 
-    def save_tags(self, resources, id_list, is_texture: bool, is_lowres: bool):
+    def save_tags(self, resources, id_list, processes: int = 1):
         written_shapes = 0
         written_movieclips = 0
         written_fields = 0
-        def save_tag(tag, data):
-            self.writer.write_uchar(tag)
-            self.writer.write_int(len(data))
-            self.writer.write(data)
 
-        if is_texture:
-            for texture in self.textures:
-                texture = copy.deepcopy(texture)
-                if is_lowres:
-                    Console.info("Writing lowres texture asset...")
-                    sheet = texture.get_image()
-                    w, h = sheet.size
-                    texture.set_image(sheet.resize((int(w / 2), int(h / 2))))
-
-                tag, data = texture.save(False)
-                save_tag(tag, data)
-            return
-        
         if self.use_uncommon_texture:
-            save_tag(SupercellSWF.USE_UNCOMMON_RESOLUTION_TAG, bytes())
+            self.writer.write_tag(SupercellSWF.USE_UNCOMMON_RESOLUTION_TAG)
 
         if self.has_external_texture:
-            save_tag(SupercellSWF.USE_EXTERNAL_TEXTURE_TAG, bytes())
+            self.writer.write_tag(SupercellSWF.USE_EXTERNAL_TEXTURE_TAG)
 
         if not self.use_uncommon_texture and self.use_lowres_texture:
-            save_tag(SupercellSWF.USE_LOWRES_TEXTURE_TAG, bytes())
+            self.writer.write_tag(SupercellSWF.USE_LOWRES_TEXTURE_TAG)
         
         for texture in self.textures:
             if self.has_external_texture:
-                texture = copy.deepcopy(texture)
+                # only texture header is written, so pixels are not copied
+                texture = copy.copy(texture)
                 texture.linear = False
 
-            tag, data = texture.save(self.has_external_texture)
-            save_tag(tag, data)
+            texture.save(self, self.has_external_texture)
 
         if self.movieclip_modifiers_count:
-            save_tag(37, (self.movieclip_modifiers_count).to_bytes(2, "little"))
+            self.writer.write_tag(SupercellSWF.MOVIECLIP_MODIFIERS_COUNT_TAG, self.movieclip_modifiers_count.to_bytes(2, "little"))
 
         ids, resources = resources
-        for (identifer, resource) in zip(ids, resources):
-            if isinstance(resource, MovieClipModifier):
-                tag, data = resource.save(id_list[identifer])
-                save_tag(tag, data)
+
+        # unchanged resources are written back from their original tag bytes, others are decoded and serialized
+        same_ids = all(identifer == id for identifer, id in id_list.items())
+
+        resource_classes = []
+        original_tags = []
+        for x, (identifer, resource) in enumerate(zip(ids, resources)):
+            original_tag = None
+
+            if isinstance(resource, TagRecord):
+                resource_classes.append(resource.resource_class)
+
+                original_tag = self.get_original_tag(identifer, resource, id_list, same_ids)
+                if original_tag is None:
+                    resources[x] = self.resources[identifer]
+            else:
+                resource_classes.append(type(resource))
+
+                if identifer is not None:
+                    original_tag = self.get_original_tag(identifer, resource, id_list, same_ids)
+
+            original_tags.append(original_tag)
+
+        serialized = None
+        if processes != 1:
+            jobs = [(resource, id_list[identifer]) for identifer, resource, original_tag in zip(ids, resources, original_tags)
+                    if not isinstance(resource, MatrixBank) and original_tag is None]
+
+            Console.info("Resources serializing...")
+            serialized = iter(serialize_resources(self.textures, jobs, id_list, processes))
+
+        for (identifer, resource, resource_class, original_tag) in zip(ids, resources, resource_classes, original_tags):
+            if resource_class is MovieClipModifier:
+                self.save_resource(resource, original_tag, serialized, id_list[identifer])
             
-            elif isinstance(resource, Shape):
+            elif resource_class is Shape:
                 Console.progress_bar("Shapes writing...", written_shapes, self.shapes_count)
-                tag, data = resource.save(self, id_list[identifer])
-                save_tag(tag, data)
+                self.save_resource(resource, original_tag, serialized, id_list[identifer])
                 written_shapes += 1
-                if written_shapes == self.shapes_count:
-                    print()
             
-            elif isinstance(resource, TextField):
+            elif resource_class is TextField:
                 Console.progress_bar("Text fields writing...", written_fields, self.text_fields_count)
-                tag, data = resource.save(id_list[identifer])
-                save_tag(tag, data)
+                self.save_resource(resource, original_tag, serialized, id_list[identifer])
                 written_fields += 1
-                if written_fields == self.text_fields_count:
-                    print()
 
-            elif isinstance(resource, MatrixBank):
-                written_transforms = 0
+            elif resource_class is MatrixBank:
                 if resource.index > 0:
-                    tag, data = resource.save()
-                    save_tag(tag, data)
-
-                for matrix in resource.matrices:
-                    Console.progress_bar(f"Matrices bank {resource.index} writing...", written_transforms, len(resource.matrices))
-
-                    matrix.save(self)
+                    resource.save(self)
 
-                    written_transforms += 1
-                print()
-                written_transforms = 0
-                for color_transform in resource.color_transforms:
-                    Console.progress_bar(f"Colors bank {resource.index} writing...", written_transforms,
-                                         len(resource.color_transforms))
-                    color_transform.save(self)
-
-                    written_transforms += 1
-                print()
+                Console.info(f"Matrices bank {resource.index} writing...")
+                resource.save_matrices(self)
+                resource.save_color_transforms(self)
             
-            elif isinstance(resource, MovieClip):
+            elif resource_class is MovieClip:
                 Console.progress_bar("Movieclips writing...", written_movieclips, self.movieclips_count)
-                tag, data = resource.save(id_list[identifer], id_list)
-                save_tag(tag, data)
+                self.save_resource(resource, original_tag, serialized, id_list[identifer], id_list)
                 written_movieclips += 1
-                if written_movieclips == self.movieclips_count:
-                    print()
 
         
         self.writer.write(bytes(5)) # end tag
+
+    def get_original_tag(self, identifer: int, resource, id_list: dict, same_ids: bool):
+        """Returns original tag bytes of an unchanged resource if they are still valid with new ids, otherwise None."""
+        original_tag = resource.get_tag()
+        if original_tag is None:
+            return None
+
+        # every resource tag starts with resource id
+        if USHORT.unpack_from(original_tag, 5)[0] != id_list[identifer]:
+            return None
+
+        # movieclip tags also store ids of bound resources
+        if not same_ids and (resource.resource_class if isinstance(resource, TagRecord) else type(resource)) is MovieClip:
+            movieclip = self.resources[identifer]
+
+            if any(id_list.get(bind["id"]) != bind["id"] for bind in movieclip.binds):
+                return None
+
+        return original_tag
+
+    def save_resource(self, resource, original_tag, serialized, *args):
+        """Writes resource tag, taking it from original or already serialized tags if there are any."""
+        if original_tag is not None:
+            self.writer.write(original_tag)
+        elif serialized is not None:
+            self.writer.write(next(serialized))
+        else:
+            resource.save(self, *args)
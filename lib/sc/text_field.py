@@ -74,35 +74,35 @@ class TextField(Writable):
 
         return id
 
-    def save(self, id: int):
-        super().save()
-
+    def save(self, swf, id: int):
         tag = 7
 
-        self.write_ushort(id)
+        tag_start = swf.writer.begin_tag()
+
+        swf.writer.write_ushort(id)
 
-        self.write_ascii(self.font_name)
-        self.write_int(self.font_color)
+        swf.writer.write_ascii(self.font_name)
+        swf.writer.write_int(self.font_color)
 
-        self.write_bool(self.bold)
-        self.write_bool(self.italic)
-        self.write_bool(self.multiline)
-        self.write_bool(False)  # unused
+        swf.writer.write_bool(self.bold)
+        swf.writer.write_bool(self.italic)
+        swf.writer.write_bool(self.multiline)
+        swf.writer.write_bool(False)  # unused
 
-        self.write_uchar(self.font_align)
-        self.write_uchar(self.font_size)
+        swf.writer.write_uchar(self.font_align)
+        swf.writer.write_uchar(self.font_size)
 
-        self.write_short(self.top_corner)
-        self.write_short(self.bottom_corner)
-        self.write_short(self.left_corner)
-        self.write_short(self.right_corner)
+        swf.writer.write_short(self.top_corner)
+        swf.writer.write_short(self.bottom_corner)
+        swf.writer.write_short(self.left_corner)
+        swf.writer.write_short(self.right_corner)
 
-        self.write_bool(self.outline)
-        self.write_ascii(self.text)
+        swf.writer.write_bool(self.outline)
+        swf.writer.write_ascii(self.text)
 
         if self.flag1 is not None:
             tag = 15
-            self.write_bool(self.flag1)
+            swf.writer.write_bool(self.flag1)
 
             if self.flag2 is not None:
                 if self.flag2:
@@ -110,45 +110,51 @@ class TextField(Writable):
                 else:
                     if self.outline_color is not None:
                         tag = 21
-                        self.write_int(self.outline_color)
+                        swf.writer.write_int(self.outline_color)
 
                         if self.c1 is not None:
                             tag = 25
-                            self.write_short(self.c1)
-                            self.write_short(0)  # unused
+                            swf.writer.write_short(self.c1)
+                            swf.writer.write_short(0)  # unused
 
                             if self.c2 is not None:
                                 tag = 33
-                                self.write_short(self.c2)
+                                swf.writer.write_short(self.c2)
 
                                 if self.flag3 is not None:
                                     tag = 43
                                     if self.flag3:
                                         tag = 44
-                                        self.write_bool(self.flag3)
-
-        return tag, self.buffer
+                                        swf.writer.write_bool(self.flag3)
+
+        swf.writer.end_tag(tag_start, tag)
+
+    def get_key(self):
+        return (self.font_name,
+                self.font_color,
+                self.outline_color,
+                self.font_size,
+                self.font_align,
+                self.bold,
+                self.italic,
+                self.multiline,
+                self.outline,
+                self.left_corner,
+                self.top_corner,
+                self.right_corner,
+                self.bottom_corner,
+                self.text,
+                self.flag1,
+                self.flag2,
+                self.flag3,
+                self.c1,
+                self.c2)
 
     def __eq__(a, b):
         if type(a) == type(b):
-            if a.font_name == b.font_name\
-                    and a.font_color == b.font_color\
-                    and a.outline_color == b.outline_color\
-                    and a.font_size == b.font_size\
-                    and a.font_size == b.font_size\
-                    and a.font_align == b.font_align\
-                    and a.bold == b.bold\
-                    and a.italic == b.italic\
-                    and a.multiline == b.multiline\
-                    and a.left_corner == b.left_corner\
-                    and a.top_corner == b.top_corner\
-                    and a.right_corner == b.right_corner\
-                    and a.bottom_corner == b.bottom_corner\
-                    and a.text == b.text\
-                    and a.flag1 == b.flag1\
-                    and a.flag2 == b.flag2\
-                    and a.flag3 == b.flag3\
-                    and a.c1 == b.c1\
-                    and a.c2 == b.c2:
+            if a.get_key() == b.get_key():
                 return True
         return False
+
+    def __hash__(self):
+        return hash(self.get_key())
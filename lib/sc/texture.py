@@ -1,5 +1,8 @@
+import copy
+
 from .writable import Writable
 
+import numpy as np
 from PIL import Image
 
 from lib.console import Console
@@ -101,7 +104,7 @@ def read_rgb5_a1(swf):
     r = ((p >> 11) & 31) << 3
     g = ((p >> 6) & 31) << 3
     b = ((p >> 1) & 31) << 3
-    a = (p & 255) << 7
+    a = (p & 1) * 255
     return r, g, b, a
 
 
@@ -123,6 +126,51 @@ def read_luminance8(swf):
     return swf.reader.read_uchar()
 
 
+def decode_rgba8(data, count: int):
+    return np.frombuffer(data, np.uint8, count * 4).reshape(count, 4)
+
+
+def decode_rgba4(data, count: int):
+    p = np.frombuffer(data, "<u2", count)
+
+    pixels = np.empty((count, 4), np.uint8)
+    pixels[:, 0] = ((p >> 12) & 15) << 4
+    pixels[:, 1] = ((p >> 8) & 15) << 4
+    pixels[:, 2] = ((p >> 4) & 15) << 4
+    pixels[:, 3] = (p & 15) << 4
+    return pixels
+
+
+def decode_rgb5_a1(data, count: int):
+    p = np.frombuffer(data, "<u2", count)
+
+    pixels = np.empty((count, 4), np.uint8)
+    pixels[:, 0] = ((p >> 11) & 31) << 3
+    pixels[:, 1] = ((p >> 6) & 31) << 3
+    pixels[:, 2] = ((p >> 1) & 31) << 3
+    pixels[:, 3] = (p & 1) * 255
+    return pixels
+
+
+def decode_rgb565(data, count: int):
+    p = np.frombuffer(data, "<u2", count)
+
+    pixels = np.empty((count, 3), np.uint8)
+    pixels[:, 0] = ((p >> 11) & 31) << 3
+    pixels[:, 1] = ((p >> 5) & 63) << 2
+    pixels[:, 2] = (p & 31) << 3
+    return pixels
+
+
+def decode_luminance8_alpha8(data, count: int):
+    # stored as (alpha, luminance) pairs
+    return np.frombuffer(data, np.uint8, count * 2).reshape(count, 2)[:, ::-1]
+
+
+def decode_luminance8(data, count: int):
+    return np.frombuffer(data, np.uint8, count)
+
+
 def write_rgba8(swf, pixel):
     r, g, b, a = pixel
     swf.write_uchar(r)
@@ -155,6 +203,38 @@ def write_luminance8(swf, pixel):
     swf.write_uchar(int(pixel))
 
 
+def encode_rgba8(pixels):
+    return pixels.astype(np.uint8, copy=False)
+
+
+def encode_rgba4(pixels):
+    pixels = pixels.astype(np.uint16)
+    r, g, b, a = pixels[:, 0], pixels[:, 1], pixels[:, 2], pixels[:, 3]
+    return (a >> 4 | b >> 4 << 4 | g >> 4 << 8 | r >> 4 << 12).astype("<u2")
+
+
+def encode_rgb5_a1(pixels):
+    pixels = pixels.astype(np.uint16)
+    r, g, b, a = pixels[:, 0], pixels[:, 1], pixels[:, 2], pixels[:, 3]
+    return (a >> 7 | b >> 3 << 1 | g >> 3 << 6 | r >> 3 << 11).astype("<u2")
+
+
+def encode_rgb565(pixels):
+    pixels = pixels.astype(np.uint16)
+    r, g, b = pixels[:, 0], pixels[:, 1], pixels[:, 2]
+    return (b >> 3 | g >> 2 << 5 | r >> 3 << 11).astype("<u2")
+
+
+def encode_luminance8_alpha8(pixels):
+    pixels = pixels.astype(np.uint16)
+    l, a = pixels[:, 0], pixels[:, 1]
+    return (l << 8 | a).astype("<u2")
+
+
+def encode_luminance8(pixels):
+    return pixels.astype(np.uint8, copy=False)
+
+
 PIXEL_READ_FUNCTIONS = {
     "GL_RGBA8": read_rgba8,
     "GL_RGBA4": read_rgba4,
@@ -164,6 +244,33 @@ PIXEL_READ_FUNCTIONS = {
     "GL_LUMINANCE8": read_luminance8
 }
 
+PIXEL_DECODE_FUNCTIONS = {
+    "GL_RGBA8": decode_rgba8,
+    "GL_RGBA4": decode_rgba4,
+    "GL_RGB5_A1": decode_rgb5_a1,
+    "GL_RGB565": decode_rgb565,
+    "GL_LUMINANCE8_ALPHA8": decode_luminance8_alpha8,
+    "GL_LUMINANCE8": decode_luminance8
+}
+
+PIXEL_ENCODE_FUNCTIONS = {
+    "GL_RGBA8": encode_rgba8,
+    "GL_RGBA4": encode_rgba4,
+    "GL_RGB5_A1": encode_rgb5_a1,
+    "GL_RGB565": encode_rgb565,
+    "GL_LUMINANCE8_ALPHA8": encode_luminance8_alpha8,
+    "GL_LUMINANCE8": encode_luminance8
+}
+
+PIXEL_SIZES = {
+    "GL_RGBA8": 4,
+    "GL_RGBA4": 2,
+    "GL_RGB5_A1": 2,
+    "GL_RGB565": 2,
+    "GL_LUMINANCE8_ALPHA8": 2,
+    "GL_LUMINANCE8": 1
+}
+
 PIXEL_WRITE_FUNCTIONS = {
     "GL_RGBA8": write_rgba8,
     "GL_RGBA4": write_rgba4,
@@ -174,6 +281,81 @@ PIXEL_WRITE_FUNCTIONS = {
 }
 
 
+def decode_pixels(data, pixel_internal_format: str, count: int):
+    """Decodes `count` pixels from a raw texture payload into a (count, channels) array."""
+    return PIXEL_DECODE_FUNCTIONS[pixel_internal_format](data, count)
+
+
+def encode_pixels(pixels, pixel_internal_format: str) -> bytes:
+    """Encodes a (count, channels) array of pixels into a raw texture payload."""
+    return PIXEL_ENCODE_FUNCTIONS[pixel_internal_format](pixels).tobytes()
+
+
+def _untile_bands(pixels, bands_count: int, band_height: int, width: int, block_size: int):
+    channels = pixels.shape[1:]
+
+    x_blocks = width // block_size
+    blocks_width = x_blocks * block_size
+
+    bands = pixels.reshape(bands_count, band_height * width, *channels)
+    blocks = bands[:, :band_height * blocks_width].reshape(bands_count, x_blocks, band_height, block_size, *channels)
+    blocks = blocks.swapaxes(1, 2).reshape(bands_count * band_height, blocks_width, *channels)
+    edge = bands[:, band_height * blocks_width:].reshape(bands_count * band_height, width - blocks_width, *channels)
+
+    return np.concatenate((blocks, edge), axis=1)
+
+
+def _tile_bands(pixels, bands_count: int, band_height: int, block_size: int):
+    width = pixels.shape[1]
+    channels = pixels.shape[2:]
+
+    x_blocks = width // block_size
+    blocks_width = x_blocks * block_size
+
+    blocks = pixels[:, :blocks_width].reshape(bands_count, band_height, x_blocks, block_size, *channels)
+    blocks = blocks.swapaxes(1, 2).reshape(bands_count, band_height * blocks_width, *channels)
+    edge = pixels[:, blocks_width:].reshape(bands_count, band_height * (width - blocks_width), *channels)
+
+    return np.concatenate((blocks, edge), axis=1).reshape(bands_count * band_height * width, *channels)
+
+
+def untile_pixels(pixels, width: int, height: int, block_size: int = 32):
+    """Converts a flat array of pixels stored in block order into a (height, width, channels) array."""
+    full_height = height - height % block_size
+    full_count = full_height * width
+
+    planes = [_untile_bands(pixels[:full_count], height // block_size, block_size, width, block_size)]
+    if full_height != height:
+        planes.append(_untile_bands(pixels[full_count:width * height], 1, height - full_height, width, block_size))
+
+    return np.concatenate(planes, axis=0)
+
+
+def tile_pixels(pixels, block_size: int = 32):
+    """Converts a (height, width, channels) array into a flat array of pixels stored in block order."""
+    height = pixels.shape[0]
+    full_height = height - height % block_size
+
+    planes = [_tile_bands(pixels[:full_height], height // block_size, block_size, block_size)]
+    if full_height != height:
+        planes.append(_tile_bands(pixels[full_height:], 1, height - full_height, block_size))
+
+    return np.concatenate(planes, axis=0)
+
+
+def downscale_pixels(pixels):
+    """Halves a (height, width[, channels]) array with a 2x2 box filter. Odd last row and column are dropped."""
+    for axis in (0, 1):
+        if pixels.shape[axis] == 1:
+            pixels = np.repeat(pixels, 2, axis=axis)
+
+    height = pixels.shape[0] // 2
+    width = pixels.shape[1] // 2
+
+    blocks = pixels[:height * 2, :width * 2].reshape(height, 2, width, 2, *pixels.shape[2:])
+    return ((blocks.sum(axis=(1, 3), dtype=np.uint16) + 2) >> 2).astype(np.uint8)
+
+
 class SWFTexture(Writable):
     def __init__(self) -> None:
         self.channels: int = 4
@@ -192,6 +374,11 @@ class SWFTexture(Writable):
         self.height: int = 0
 
         self._image: Image = None
+        self._pixels: np.ndarray = None
+
+        # Encoded pixels (view into decompressed file) and the layout they were stored with
+        self._payload: memoryview = None
+        self._payload_layout: tuple = None
 
     def load(self, swf, tag: int, has_external_texture: bool):
         pixel_type_index = swf.reader.read_uchar()
@@ -219,49 +406,14 @@ class SWFTexture(Writable):
             Console.info(
                 f"SWFTexture: {self.width}x{self.height} - Format: {self.pixel_type} {self.pixel_format} {self.pixel_internal_format}")
 
-            self._image = Image.new(MODES_TABLE[self.pixel_format], (self.width, self.height))
-            loaded = self._image.load()
-
-            self.channels = CHANNLES_TABLE[self._image.mode]
-
-            read_pixel = PIXEL_READ_FUNCTIONS[self.pixel_internal_format]
-
-            if self.linear:
-                for y in range(self.height):
-                    for x in range(self.width):
-                        loaded[x, y] = read_pixel(swf)
-                    
-                    Console.progress_bar("Loading texture data...", y, self.height)
-                print()
-            
-            else:
-                block_size = 32
-
-                x_blocks = self.width // block_size
-                y_blocks = self.height // block_size
+            # pixels are decoded only on first get_image call
+            self._image = None
+            self._payload = swf.reader.read_view(self.width * self.height * PIXEL_SIZES[self.pixel_internal_format])
+            self._payload_layout = self.get_layout()
 
-                for y_block in range(y_blocks + 1):
-                    for x_block in range(x_blocks + 1):
-                        for y in range(block_size):
-                            pixel_y = (y_block * block_size) + y
-
-                            if pixel_y >= self.height:
-                                break
-
-                            for x in range(block_size):
-                                pixel_x = (x_block * block_size) + x
-
-                                if pixel_x >= self.width:
-                                    break
-
-                                loaded[pixel_x, pixel_y] = read_pixel(swf)
-                    
-                    Console.progress_bar("Loading splitted texture data...", y_block, y_blocks + 1)
-            print()
-
-    def save(self, has_external_texture: bool):
-        super().save()
+            self.channels = CHANNLES_TABLE[MODES_TABLE[self.pixel_format]]
 
+    def save(self, swf, has_external_texture: bool):
         pixel_type_index = PIXEL_INTERNAL_FORMATS.index(self.pixel_internal_format)
 
         tag = 1
@@ -280,63 +432,92 @@ class SWFTexture(Writable):
         if (self.mag_filter, self.min_filter) == ("GL_NEAREST", "GL_NEAREST"):
             tag = 34
 
-        self.write_uchar(pixel_type_index)
+        tag_start = swf.writer.begin_tag()
+
+        swf.writer.write_uchar(pixel_type_index)
 
-        self.write_ushort(self.width)
-        self.write_ushort(self.height)
+        swf.writer.write_ushort(self.width)
+        swf.writer.write_ushort(self.height)
 
         Console.info(
             f"SWFTexture: {self.width}x{self.height} - Format: {self.pixel_type} {self.pixel_format} {self.pixel_internal_format}")
 
-        if not has_external_texture:
-            loaded = self._image.load()
+        if not has_external_texture and self._image is None and self._payload_layout == self.get_layout():
+            swf.writer.write(self._payload)
 
-            write_pixel = PIXEL_WRITE_FUNCTIONS[self.pixel_internal_format]
+        elif not has_external_texture:
+            pixels = self.get_pixels()
 
-            if not self.linear:
-                loaded_clone = self._image.copy().load()
+            if self.linear:
+                pixels = pixels.reshape(self.width * self.height, *pixels.shape[2:])
+            else:
+                pixels = tile_pixels(pixels)
+
+            swf.writer.write(encode_pixels(pixels, self.pixel_internal_format))
 
-                def add_pixel(pixel: tuple):
-                    loaded[pixel_index % self.width, pixel_index // self.width] = pixel
+        swf.writer.end_tag(tag_start, tag)
 
-                block_size = 32
+    def get_layout(self):
+        return self.pixel_internal_format, self.linear, self.width, self.height
 
-                x_blocks = self.width // block_size
-                y_blocks = self.height // block_size
+    def get_image(self):
+        if self._image is None and self._payload is not None:
+            pixel_internal_format, linear, width, height = self._payload_layout
+            pixels = decode_pixels(self._payload, pixel_internal_format, width * height)
 
-                pixel_index = 0
-                for y_block in range(y_blocks + 1):
-                    for x_block in range(x_blocks + 1):
-                        for y in range(block_size):
-                            pixel_y = (y_block * block_size) + y
+            if linear:
+                pixels = pixels.reshape(height, width, *pixels.shape[1:])
+            else:
+                pixels = untile_pixels(pixels, width, height)
 
-                            if pixel_y >= self.height:
-                                break
+            # decoded array is kept as pixels view of texture and image is built from it
+            pixels.flags.writeable = False
 
-                            for x in range(block_size):
-                                pixel_x = (x_block * block_size) + x
+            self._pixels = pixels
+            self._image = Image.fromarray(pixels)
 
-                                if pixel_x >= self.width:
-                                    break
+        return self._image
 
-                                add_pixel(loaded_clone[pixel_x, pixel_y])
-                                pixel_index += 1
+    def get_pixels(self):
+        """Returns image as read-only (height, width[, channels]) array, kept until image is replaced or evicted."""
+        if self._pixels is None:
+            image = self.get_image()
 
-                loaded = loaded_clone
+            # only images given to set_image are converted, decoded ones already have their pixels
+            if self._pixels is None and image is not None:
+                self._pixels = np.asarray(image)
 
-            for y in range(self.height):
-                Console.progress_bar("Writing texture data...", y, self.height)
-                for x in range(self.width):
-                    write_pixel(self, loaded[x, y])
+        return self._pixels
 
-            print()
+    def get_downscaled(self, resample: int = None):
+        """Returns a shallow copy of texture with image halved by 2x2 box filter or by given Pillow resampling filter."""
+        image = self.get_image()
 
-        return tag, self.buffer
+        if resample is None:
+            image = Image.fromarray(downscale_pixels(self.get_pixels()))
+        else:
+            image = image.resize((max(1, self.width // 2), max(1, self.height // 2)), resample)
+
+        texture = copy.copy(self)
+        texture.set_image(image)
+
+        return texture
+
+    def evict(self):
+        """Drops decoded image if it can be decoded again from the encoded payload. Returns True if it was dropped."""
+        if self._image is None or self._payload is None:
+            return False
+
+        self._image = None
+        self._pixels = None
+        return True
 
-    def get_image(self):
-        return self._image
     def set_image(self, img: Image):
         self._image = img
+        self._pixels = None
+
+        self._payload = None
+        self._payload_layout = None
 
         self.channels = CHANNLES_TABLE[self._image.mode]
         self.width, self.height = self._image.size
@@ -368,4 +549,9 @@ class SWFTexture(Writable):
             self.pixel_type = "GL_UNSIGNED_BYTE"
             self.pixel_internal_format = "GL_LUMINANCE8"
 
+    def __deepcopy__(self, memo):
+        texture = copy.copy(self)
+        texture._image = self._image.copy() if self._image is not None else None
 
+        # encoded payload is read-only and can be shared between copies
+        return texture
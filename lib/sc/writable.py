@@ -1,9 +1,37 @@
-from lib.utils import BinaryWriter
+class Writable:
+    # original tag bytes of a loaded object and hash of its key at load time,
+    # tag is written back as is while object key stays the same
+    _tag: memoryview = None
+    _tag_key_hash: int = None
 
-
-class Writable(BinaryWriter):
     def __init__(self) -> None:
         pass
 
-    def save(self):
-        super().__init__()
+    def __getstate__(self):
+        # original tag is a view into loaded file, so copies and pickled objects go without it
+        state = self.__dict__.copy()
+        state.pop("_tag", None)
+        return state
+
+    def save(self, swf, *args):
+        """Writes the object as a tag straight into swf.writer. Writes nothing by default."""
+        pass
+
+    def get_tag(self):
+        """Returns original tag bytes if object key is the same as when it was loaded, otherwise None."""
+        if self._tag is None or hash(self.get_key()) != self._tag_key_hash:
+            return None
+
+        return self._tag
+
+    def is_dirty(self):
+        return self.get_tag() is None
+
+    def mark_dirty(self):
+        """Drops original tag, so object is serialized again on save."""
+        self._tag = None
+        self._tag_key_hash = None
+
+    def mark_clean(self, tag: memoryview = None):
+        self._tag = tag
+        self._tag_key_hash = None if tag is None else hash(self.get_key())
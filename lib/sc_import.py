@@ -1,18 +1,43 @@
 import copy
 
 from lib.console import Console
-from PIL import Image
 
 from lib.sc import *
+from lib.sc.movieclip import find_unchanged_elements
+from lib.sc.sprites import extract_sprites
 from lib.fla import *
 
-shape_bitmaps_uvs = []
-shape_bitmaps_twips = []
 shapes_with_nine_slices = {}
 
 
-def sc_to_fla(filepath):
+class SpriteRegistry:
+    """Sprites exported during one conversion, by texture index and UV coordinates."""
+
+    def __init__(self) -> None:
+        self.sprites: dict = {}
+
+        # (texture_index, uv_coords, rotation, mirror) of each sprite by its index
+        self.jobs: list = []
+
+    @staticmethod
+    def get_key(texture_index: int, uv_coords: list):
+        return texture_index, tuple(tuple(point) for point in uv_coords)
+
+    def get(self, texture_index: int, uv_coords: list):
+        """Returns (index, twips) of already registered sprite or None."""
+        return self.sprites.get(SpriteRegistry.get_key(texture_index, uv_coords))
+
+    def add(self, texture_index: int, uv_coords: list, twips: list, rotation: int, mirror: bool):
+        index = len(self.jobs)
+        self.sprites[SpriteRegistry.get_key(texture_index, uv_coords)] = (index, twips)
+        self.jobs.append((texture_index, uv_coords, rotation, mirror))
+
+        return index
+
+
+def sc_to_fla(filepath, cache=None, processes: int = None):
     swf = SupercellSWF()
+    swf.cache = cache
     swf.load(filepath)
 
     projectdir = os.path.splitext(swf.filename)[0]
@@ -24,7 +49,7 @@ def sc_to_fla(filepath):
 
     fla.timelines = startup.timelines
 
-    proceed_resources(fla, swf)
+    proceed_resources(fla, swf, SpriteRegistry(), processes)
 
     XFL.save(fla)
 
@@ -53,24 +78,32 @@ def prepare_document(path):
     return fla
 
 
-def proceed_resources(fla, swf):
+def proceed_resources(fla, swf, sprites: SpriteRegistry, processes: int = None):
+    shapes = [(id, resource) for id, resource in swf.resources.items() if isinstance(resource, Shape)]
+    movieclips = [(id, resource) for id, resource in swf.resources.items() if isinstance(resource, MovieClip)]
+
     resource_counter = 0
-    for id, resource in swf.resources.items():
+    for id, resource in shapes:
         Console.progress_bar("Converting SupercellFlash resources to Adobe Animate...", resource_counter,
                              swf.movieclips_count + swf.shapes_count)
-        if isinstance(resource, Shape):
-            convert_shape(fla, swf, id, resource)
+        convert_shape(fla, swf, id, resource, sprites)
+        resource_counter += 1
 
-        elif isinstance(resource, MovieClip):
-            export_names = swf.exports[id] if id in swf.exports else None
-            convert_movieclip(fla, swf, id, resource, export_names)
-        else:
-            continue
+    # movieclips with nine slices edit sprites of their shapes, so sprites are extracted in between
+    Console.info(f"Extracting {len(sprites.jobs)} sprites...")
+    for index, sprite in enumerate(extract_sprites(swf, sprites.jobs, processes)):
+        fla.media[index].image = sprite
+
+    for id, resource in movieclips:
+        Console.progress_bar("Converting SupercellFlash resources to Adobe Animate...", resource_counter,
+                             swf.movieclips_count + swf.shapes_count)
+        export_names = swf.exports[id] if id in swf.exports else None
+        convert_movieclip(fla, swf, id, resource, export_names)
         resource_counter += 1
 
-    print()
+    Console.newline()
 
-def convert_shape(fla, swf, id, shape):
+def convert_shape(fla, swf, id, shape, sprites: SpriteRegistry):
     graphic = DOMSymbolItem(f"shapes/shape_{id}", "graphic")
     graphic.timeline.name = f"shape_{id}"
 
@@ -126,14 +159,13 @@ def convert_shape(fla, swf, id, shape):
             frame.elements.append(color_fill)
 
         else:
-            if uv_coords not in shape_bitmaps_uvs:
-                shape_bitmaps_uvs.append(uv_coords)
-
-                uvs_index = shape_bitmaps_uvs.index(uv_coords)
-                resource_name = f"M {uvs_index}"
+            sprite_info = sprites.get(bitmap.texture_index, uv_coords)
 
+            if sprite_info is None:
                 matrix, twips, rotation, mirror = bitmap.get_matrix(use_nearest=True)
-                shape_bitmaps_twips.append(twips)
+
+                uvs_index = sprites.add(bitmap.texture_index, uv_coords, twips, rotation, mirror)
+                resource_name = f"M {uvs_index}"
 
                 bitmap_item = DOMBitmapItem(f"resources/{uvs_index}", f"{resource_name}.dat")
 
@@ -142,18 +174,12 @@ def convert_shape(fla, swf, id, shape):
                 bitmap_item.allow_smoothing = swf.textures[bitmap.texture_index].linear != True
                 bitmap_item.source_external_filepath = f"LIBRARY/resources/{uvs_index}.png"
 
-                sprite = bitmap.get_image(swf)
-                sprite = sprite.rotate(-rotation, expand = True)
-                if mirror:
-                    sprite = sprite.transpose(Image.FLIP_LEFT_RIGHT)
-                bitmap_item.image = sprite
-
+                # image is set once all sprites are extracted
                 fla.media[uvs_index] = bitmap_item
 
             else:
-                matrix, _, _, _ = bitmap.get_matrix(shape_bitmaps_twips[shape_bitmaps_uvs.index(uv_coords)])
-
-            uvs_index = shape_bitmaps_uvs.index(uv_coords)
+                uvs_index, twips = sprite_info
+                matrix, _, _, _ = bitmap.get_matrix(twips)
 
             bitmap_instance = DOMBitmapInstance()
             bitmap_instance.library_item_name = f"resources/{uvs_index}"
@@ -217,6 +243,44 @@ def patch_shape_nine_slice(fla, id, shape):
     return shape_slice
 
 
+def order_layers(layers_order: list, frames_elements: list):
+    """Reorders layers so that each frame stacks its elements in the same order, frame after frame.
+    When frames contradict each other, a later frame moves the layers it sees in other order right next to each other.
+    Frames that already agree with the order are checked in a single pass and move nothing."""
+    layers_order = list(layers_order)
+    positions = {layer: index for index, layer in enumerate(layers_order)}
+
+    for elements in frames_elements:
+        # bind repeated in frame is compared by its first element
+        unique_elements = list(dict.fromkeys(elements))
+        frame_positions = {element: index for index, element in enumerate(unique_elements)}
+
+        if all(positions[below] < positions[above] for below, above in zip(unique_elements, unique_elements[1:])):
+            continue
+
+        for element in elements:
+            for comparative in unique_elements:
+                if comparative == element:
+                    continue
+
+                frame_position = frame_positions[element] > frame_positions[comparative]  # higher if True else lower
+                binds_position = positions[element] > positions[comparative]
+
+                if frame_position == binds_position:
+                    continue
+
+                # comparative is put right above the element if it is higher in frame, otherwise right below it
+                element_index = positions[element]
+                comparative_index = positions[comparative]
+
+                layers_order.insert(element_index, layers_order.pop(comparative_index))
+
+                for index in range(min(element_index, comparative_index), max(element_index, comparative_index) + 1):
+                    positions[layers_order[index]] = index
+
+    return layers_order
+
+
 def convert_movieclip(fla, swf, id, movieclip: MovieClip, export_names: list = None):
     movie = DOMSymbolItem()
 
@@ -334,31 +398,33 @@ def convert_movieclip(fla, swf, id, movieclip: MovieClip, export_names: list = N
                 bind_instance.text_runs.append(text_run)
 
             else:
-                print("Unkwnown resource type")
+                Console.warning("Unkwnown resource type")
                 raise TypeError()
 
             symbols_instance.append(bind_instance)
             layers_instance.append(bind_layer)
 
-    # Converting frames
-    for i, frame in enumerate(movieclip.frames):
-        elements = [element['bind'] for element in frame.elements]
-        elements_idx = [element for element in elements if not isinstance(swf.resources[movieclip.binds[element]['id']], MovieClipModifier)]
+    frame_elements, frame_offsets = movieclip.get_elements()
+
+    # elements that stay the same as in previous frame extend their keyframe instead of making a new one
+    unchanged_elements = find_unchanged_elements(frame_elements, frame_offsets).tolist()
 
-        for element in elements_idx:
-            for comparative in elements_idx:
-                if comparative != element:
-                    element_pos = elements_idx.index(element)
-                    bind_pos = layers_order.index(element)
+    frame_elements = frame_elements.tolist()
+    frame_offsets = frame_offsets.tolist()
 
-                    comparative_pos = elements_idx.index(comparative)
-                    cmp_bind_pos = layers_order.index(comparative)
+    # Layer order
+    layers_order = order_layers(layers_order, [
+        [bind for bind, _, _ in frame_elements[frame_offsets[i]:frame_offsets[i + 1]] if layers_instance[bind] is not None]
+        for i in range(len(movieclip.frames))
+    ])
 
-                    frame_position = element_pos > comparative_pos  # higher if True else lower
-                    binds_position = bind_pos > cmp_bind_pos
+    # Converting frames
+    for i, frame in enumerate(movieclip.frames):
+        # position of first element of each bind in frame
+        elements = {}
+        for element_index in range(frame_offsets[i], frame_offsets[i + 1]):
+            elements.setdefault(frame_elements[element_index][0], element_index)
 
-                    if frame_position != binds_position:
-                        layers_order.insert(layers_order.index(element), layers_order.pop(cmp_bind_pos))
         mask = False
         masked = False
         mask_layer = None
@@ -390,23 +456,24 @@ def convert_movieclip(fla, swf, id, movieclip: MovieClip, export_names: list = N
                             masked_layers[mask_layer].append(curr_layer)
                             masked_layers_order[mask_layer].append(masked_layers[mask_layer].index(curr_layer))
 
-                    element = frame.elements[elements.index(layer_idx)]
+                    element_index = elements[layer_idx]
+                    _, matrix_index, color_index = frame_elements[element_index]
 
                     if curr_layer.frames and i:
-                        if element in movieclip.frames[i-1].elements:
+                        if unchanged_elements[element_index]:
                             curr_layer.frames[-1].duration += 1
                             continue
 
                     layer_frame = DOMFrame(i)
-                    instance = copy.deepcopy(symbols_instance[layer_idx])
+                    instance = FrameInstance(symbols_instance[layer_idx])
 
 
-                    if element["matrix"] != 0xFFFF:
-                        m = swf.matrix_banks[movieclip.matrix_bank].matrices[element["matrix"]]
+                    if matrix_index != 0xFFFF:
+                        m = swf.matrix_banks[movieclip.matrix_bank].matrices[matrix_index]
                         instance.matrix = Matrix(m.a, m.b, m.c, m.d, m.tx, m.ty)
 
-                    if element["color"] != 0xFFFF:
-                        c = swf.matrix_banks[movieclip.matrix_bank].color_transforms[element["color"]]
+                    if color_index != 0xFFFF:
+                        c = swf.matrix_banks[movieclip.matrix_bank].color_transforms[color_index]
                         bind_color = Color()
                         bind_color.red_offset = c.r_add
                         bind_color.green_offset = c.g_add
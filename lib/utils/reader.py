@@ -1,36 +1,120 @@
-from io import BytesIO
+from struct import Struct, error as StructError
 
+import numpy as np
 
-class BinaryReader(BytesIO):
+
+CHAR = Struct("<b")
+UCHAR = Struct("<B")
+SHORT = Struct("<h")
+USHORT = Struct("<H")
+INT = Struct("<i")
+
+
+class BinaryReader:
     def __init__(self, initial_bytes: bytes) -> None:
-        super().__init__(initial_bytes)
+        self._view = memoryview(initial_bytes).cast("B")
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def tell(self):
+        return self._position
+
+    def seek(self, position: int):
+        self._position = position
+        return position
 
     def skip(self, size: int):
-        self.read(size)
+        self._position += size
+
+    def read(self, size: int = -1):
+        return bytes(self.read_view(size))
+
+    def read_view(self, size: int = -1):
+        start = self._position
+        end = len(self._view) if size < 0 else min(start + size, len(self._view))
+
+        self._position = end
+        return self._view[start:end]
+
+    def get_view(self, start: int, end: int):
+        """Returns a zero-copy view of bytes in range without moving position."""
+        return self._view[start:end]
 
     def read_bool(self):
         return self.read_uchar() >= 1
 
+    def read_partial(self, size: int, signed: bool):
+        # like BytesIO based reader, values at end of buffer are read only from remaining bytes, so they are 0 at the very end
+        return int.from_bytes(self.read(size), "little", signed=signed)
+
     def read_char(self):
-        return int.from_bytes(self.read(1), "little", signed=True)
+        try:
+            value, = CHAR.unpack_from(self._view, self._position)
+        except StructError:
+            return self.read_partial(1, True)
+
+        self._position += 1
+        return value
 
     def read_uchar(self):
-        return int.from_bytes(self.read(1), "little", signed=False)
+        try:
+            value = self._view[self._position]
+        except IndexError:
+            return self.read_partial(1, False)
+
+        self._position += 1
+        return value
 
     def read_short(self):
-        return int.from_bytes(self.read(2), "little", signed=True)
+        try:
+            value, = SHORT.unpack_from(self._view, self._position)
+        except StructError:
+            return self.read_partial(2, True)
+
+        self._position += 2
+        return value
 
     def read_ushort(self):
-        return int.from_bytes(self.read(2), "little", signed=False)
+        try:
+            value, = USHORT.unpack_from(self._view, self._position)
+        except StructError:
+            return self.read_partial(2, False)
+
+        self._position += 2
+        return value
 
     def read_int(self):
-        return int.from_bytes(self.read(4), "little", signed=True)
+        try:
+            value, = INT.unpack_from(self._view, self._position)
+        except StructError:
+            return self.read_partial(4, True)
+
+        self._position += 4
+        return value
 
     def read_ascii(self):
         size = self.read_uchar()
         if size != 0xFF:
-            return self.read(size).decode('ascii')
+            return str(self.read_view(size), 'ascii')
         return None
 
     def read_twip(self):
         return self.read_int() / 20
+
+    def read_array(self, dtype, count: int):
+        dtype = np.dtype(dtype)
+
+        array = np.frombuffer(self._view, dtype, count, self._position)
+        self._position += dtype.itemsize * count
+        return array
+
+    def read_ushorts(self, count: int):
+        return self.read_array("<u2", count)
+
+    def read_ints(self, count: int):
+        return self.read_array("<i4", count)
+
+    def read_twips(self, count: int):
+        return self.read_ints(count) / 20
@@ -1,41 +1,73 @@
-from io import BytesIO
+from struct import Struct
 
 
-class BinaryWriter(BytesIO):
+CHAR = Struct("<b")
+UCHAR = Struct("<B")
+SHORT = Struct("<h")
+USHORT = Struct("<H")
+INT = Struct("<i")
+
+TAG_HEADER = Struct("<Bi")
+
+
+class BinaryWriter:
     def __init__(self, initial_bytes: bytes = b"") -> None:
-        super().__init__(initial_bytes)
-    
+        self._buffer = bytearray(initial_bytes)
+
+    def __len__(self):
+        return len(self._buffer)
+
     @property
     def buffer(self):
-        return self.getvalue()
-    
+        return self._buffer
+
+    def tell(self):
+        return len(self._buffer)
+
+    def write(self, data: bytes):
+        self._buffer += data
+
     def fill(self, size: int):
-        self.write(b"\x00" * size)
-    
+        self._buffer += bytes(size)
+
     def write_bool(self, data: bool):
-        self.write(int(data).to_bytes(1, "little"))
-    
+        self._buffer.append(int(data))
+
     def write_char(self, data: int):
-        self.write(data.to_bytes(1, "little", signed=True))
-    
+        self._buffer += CHAR.pack(data)
+
     def write_uchar(self, data: int):
-        self.write(data.to_bytes(1, "little", signed=False))
-    
+        self._buffer.append(data)
+
     def write_short(self, data: int):
-        self.write(data.to_bytes(2, "little", signed=True))
-    
+        self._buffer += SHORT.pack(data)
+
     def write_ushort(self, data: int):
-        self.write(data.to_bytes(2, "little", signed=False))
-    
+        self._buffer += USHORT.pack(data)
+
     def write_int(self, data: int):
-        self.write(data.to_bytes(4, "little", signed=True))
-    
+        self._buffer += INT.pack(data)
+
     def write_ascii(self, data: str = None):
         if not data:
             self.write_uchar(0xFF)
         else:
             self.write_uchar(len(data))
             self.write(data.encode('ascii'))
-    
+
     def write_twip(self, data: float):
         self.write_int(int(round(data * 20)))
+
+    def write_tag(self, tag: int, data: bytes = b""):
+        self._buffer += TAG_HEADER.pack(tag, len(data))
+        self._buffer += data
+
+    def begin_tag(self):
+        """Reserves a tag header in place and returns its position for end_tag."""
+        position = len(self._buffer)
+        self._buffer += bytes(TAG_HEADER.size)
+        return position
+
+    def end_tag(self, position: int, tag: int):
+        """Back-patches the tag id and the length of everything written since begin_tag."""
+        TAG_HEADER.pack_into(self._buffer, position, tag, len(self._buffer) - position - TAG_HEADER.size)
@@ -3,53 +3,84 @@ import os
 import time
 import argparse
 
-from sc_compression.signatures import Signatures
-from sc_compression import Decompressor, Compressor
-
 from lib.console import Console, Time
+from lib.sc.compression import decompress_file, compress, benchmark_compression, COMPRESSION_SIGNATURES
+from lib.sc.cache import DecompressionCache
 
 def main():
     parser = argparse.ArgumentParser(description="SC tool by SCW Make - github.com/scwmake/SC")
 
     parser.add_argument("-d", "--decompile", help="Convert *.sc file to *.fla", type=str)
     parser.add_argument("-dx", "--decompress", help="Decompress *.sc files with Supercell compression", type=str)
-    parser.add_argument("-cx", "--compress", help="Compress *.sc files with Supercell compression (LZMA | SC | version 1)", type=str)
+    parser.add_argument("-cx", "--compress", help="Compress *.sc files with Supercell compression (LZMA | SC | version 1 by default)", type=str)
+    parser.add_argument("--signature", help="Compression backend", choices=list(COMPRESSION_SIGNATURES), default="lzma")
+    parser.add_argument("--level", help="Compression level", type=int)
+    parser.add_argument("--threads", help="ZSTD compression threads (one per CPU by default, 0 for single-threaded)", type=int, default=-1)
+    parser.add_argument("--bench-compression", help="Report ratio and time of every compression backend on *.sc file", type=str)
+    parser.add_argument("--processes", help="Worker processes for sprite extraction (one per CPU by default)", type=int)
+    parser.add_argument("--cache", help="Directory to cache decompressed *.sc files in", type=str)
+    parser.add_argument("--cache-size", help="Maximum size of cache directory in megabytes", type=int, default=4096)
+    parser.add_argument("--log-level", help="Minimal level of shown messages", choices=list(Console.LEVELS), default="info")
+    parser.add_argument("-q", "--quiet", help="Show nothing but errors", action="store_true")
+    parser.add_argument("--json", help="Print messages and progress as JSON lines", action="store_true")
 
     args = parser.parse_args()
 
+    Console.configure("error" if args.quiet else args.log_level, args.json)
+
     start_time = time.time()
 
+    cache = None
+    if args.cache:
+        cache = DecompressionCache(args.cache, args.cache_size * 1024 * 1024)
+
     if args.decompile:
         from lib import sc_to_fla
-        sc_to_fla(args.decompile)
+        sc_to_fla(args.decompile, cache, args.processes)
 
     elif args.decompress:
         file = args.decompress
 
-        decompressor = Decompressor()
-        decompressed = decompressor.decompress(open(file, 'rb').read().split(b"START")[0])
+        decompressed = cache.decompress_file(file) if cache else decompress_file(file)
 
         open(file + ".dec", 'wb').write(decompressed)
 
     elif args.compress:
         file = args.compress
 
-        compressor = Compressor()
-        compressed = compressor.compress(open(file, 'rb').read(), Signatures.SC, 1)
+        compressed = compress(open(file, 'rb').read(), args.signature, args.level, args.threads)
 
         open(file + ".cmp", 'wb').write(compressed)
 
+    elif args.bench_compression:
+        file = args.bench_compression
+
+        data = decompress_file(file)
+
+        for signature, size, seconds in benchmark_compression(data, args.level, args.threads):
+            Console.info(f"{signature}: {size} bytes, ratio {len(data) / size:.2f}, {seconds * 1000:.1f} msec")
+
 
     else:
         Console.title("SC tool by SCW Make - github.com/scwmake/SC")
         print("-d, --decompile : Convert *.sc file to *.fla")
         print("-dx, --decompress : Decompress *.sc files with Supercell compression")
-        print("-cx, --compress : Compress *.sc files with Supercell compression (LZMA | SC | version 1)")
+        print("-cx, --compress : Compress *.sc files with Supercell compression (LZMA | SC | version 1 by default)")
+        print("--signature : Compression backend (lzma | lzham | zstd)")
+        print("--level : Compression level")
+        print("--threads : ZSTD compression threads (one per CPU by default, 0 for single-threaded)")
+        print("--bench-compression : Report ratio and time of every compression backend on *.sc file")
+        print("--processes : Worker processes for sprite extraction (one per CPU by default)")
+        print("--cache : Directory to cache decompressed *.sc files in")
+        print("--cache-size : Maximum size of cache directory in megabytes (4096 by default)")
+        print("--log-level : Minimal level of shown messages (debug | info | warning | error | quiet)")
+        print("-q, --quiet : Show nothing but errors")
+        print("--json : Print messages and progress as JSON lines")
         exit(0)
 
     result_time = time.time() - start_time
 
-    print(f"Done in {Time(result_time)} seconds!")
+    Console.info(f"Done in {Time(result_time)} seconds!")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+import numpy as np
+
+from lib.sc import SupercellSWF, Shape, MovieClip, MovieClipFrame
+from lib.sc.matrix_bank import Matrix
+from lib.sc.movieclip import FRAME_ELEMENT_DTYPE, BLENDMODES
+
+
+def create_movieclip(swf, matrices: list):
+    movieclip = MovieClip()
+    movieclip.binds = [{"id": 0, "blend": BLENDMODES[0], "name": None}]
+
+    frame = MovieClipFrame()
+    frame.elements = np.zeros(len(matrices), FRAME_ELEMENT_DTYPE)
+    frame.elements["color"] = 0xFFFF
+    movieclip.frames = [frame]
+
+    for x, matrix in enumerate(matrices):
+        frame.elements["matrix"][x] = swf.get_matrix(movieclip, matrix)
+
+    return movieclip
+
+
+def get_matrices(swf, movieclip):
+    matrices = swf.matrix_banks[movieclip.matrix_bank].matrices
+    return [matrices[index].get_key() for index in movieclip.frames[0].elements["matrix"].tolist()]
+
+
+def test_full_matrix_bank_spills_to_new_bank(tmp_path):
+    swf = SupercellSWF()
+    swf.resources[0] = Shape()
+
+    # first movieclip almost fills bank 0, second one starts in it and moves to a new bank halfway
+    first = [Matrix(1, 0, 0, 1, x, 0) for x in range(65000)]
+    second = [Matrix(1, 0, 0, 1, x, 1) for x in range(1000)]
+
+    swf.resources[1] = create_movieclip(swf, first)
+    swf.resources[2] = create_movieclip(swf, second)
+
+    assert swf.resources[1].matrix_bank == 0
+    assert swf.resources[2].matrix_bank == 1
+    assert len(swf.matrix_banks[0].matrices) <= 65534
+
+    expected = [get_matrices(swf, swf.resources[1]), get_matrices(swf, swf.resources[2])]
+    assert expected == [[matrix.get_key() for matrix in first], [matrix.get_key() for matrix in second]]
+
+    filepath = str(tmp_path / "spill.sc")
+    swf.save(filepath)
+
+    loaded = SupercellSWF()
+    loaded.load(filepath)
+
+    movieclips = [resource for resource in loaded.resources.values() if isinstance(resource, MovieClip)]
+    assert [movieclip.matrix_bank for movieclip in movieclips] == [0, 1]
+    assert [get_matrices(loaded, movieclip) for movieclip in movieclips] == expected